@@ -1,10 +1,24 @@
+import re
+import time
+import uuid
+
 import streamlit as st
-import requests
-import pandas as pd
-import os
-from datetime import datetime
-from bs4 import BeautifulSoup
-from openai import OpenAI
+import streamlit.components.v1 as components
+from streamlit.errors import StreamlitAPIException
+
+import scout
+import tracing
+from chat_context import ChatContext
+from http_client import RateLimited, get_http_client
+from llm_cache import get_llm_cache
+from page_cache import get_page_cache
+from photo_cache import get_photo_cache, placeholder_photo
+from pipeline import get_pipeline
+from player_index import get_player_index
+from prompts import chat_system_message
+from session_store import PlayerSession, get_session_store
+from settings import SESSION_RETENTION
+from stats_corpus import get_stats_corpus
 
 # Set page config
 st.set_page_config(
@@ -20,231 +34,279 @@ st.set_page_config(
 # Create API client
 @st.cache_resource
 def get_openai_client():
-    api_key = os.environ.get("OPENAI_API_KEY")
-    if not api_key:
-        st.error("Missing OpenAI API key. Please set the OPENAI_API_KEY environment variable.")
-        st.stop()
-    return OpenAI(api_key=api_key)
-
-# Function to scrape player data
-def get_player_data(url):
-    # Get the webpage content
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, 'html.parser')
-    
-    # Extract player info
     try:
-        name = soup.select_one('h1 span').text.strip() if soup.select_one('h1 span') else None
-        position_element = soup.select_one('p:-soup-contains("Position:")')
-        if position_element:
-            text = position_element.get_text()
-            position = text.split("Position:")[1].split("▪")[0].strip()
-        birthday = soup.select_one('span[id="necro-birth"]').text.strip()
-        age = (datetime.now() - datetime.strptime(birthday, '%B %d, %Y')).days // 365
-        team = soup.select_one('p:-soup-contains("Club")').text.split(':')[-1].strip()
-        
-        # Try multiple selectors for player photo
-        photo_url = None
-        
-        # Debug info about images
-        all_imgs = soup.find_all('img')
-        
-        # Try specific selector for headshot
-        photo_element = soup.select_one('img[class*="headshot"]')
-        if photo_element and 'src' in photo_element.attrs:
-            photo_url = photo_element['src']
-            # Ensure the URL is absolute
-            if not photo_url.startswith('http'):
-                photo_url = f"https://fbref.com{photo_url}"
-            
-        else:
-            # Try another approach - look in the media-item div
-            media_div = soup.select_one('div.media-item')
-            if media_div:
-                photo_element = media_div.find('img')
-                if photo_element and 'src' in photo_element.attrs:
-                    photo_url = photo_element['src']
-                    # Ensure the URL is absolute
-                    if not photo_url.startswith('http'):
-                        photo_url = f"https://fbref.com{photo_url}"
-                    
-        
-        # Find the first table with ID starting with scout_summary_
-        table_id = None
-        tables = soup.find_all('table')
-        for table in tables:
-            table_id = table.get('id', '')
-            if table_id and table_id.startswith('scout_summary_'):
-                break
-        
-        # If no matching table found, default to a common one
-        if not table_id or not table_id.startswith('scout_summary_'):
-            table_id = "scout_summary_AM"
-        
-        df = pd.read_html(response.text, attrs={'id': table_id})[0]
-        df = df.dropna(subset='Statistic')
-        
-        return name, position, age, team, photo_url, df
-    
-    except Exception as e:
-        st.error(f"Error scraping player data: {str(e)}")
-        return None, None, None, None, None, None
+        return scout.get_openai_client()
+    except RuntimeError as e:
+        st.error(str(e))
+        st.stop()
 
-# Function to generate scouting report
-def generate_scouting_report(player_name, position, age, team, stats_df):
-    client = get_openai_client()
-    
-    prompt = f"""
-    I need you to create a scouting report on {player_name}. Can you provide me with a summary of their strengths and weaknesses?
+# Start the Prometheus exporters configured by SCOUT_METRICS_PORT / SCOUT_METRICS_FILE, once per process
+@st.cache_resource
+def start_metrics_exporters():
+    tracing.start_exporters()
 
-    Here is the data I have on him:
+start_metrics_exporters()
 
-    Player: {player_name}
-    Position: {position}
-    Age: {age}
-    Team: {team}
+# Reports and conversations for every session, spilled to disk and reloaded on demand
+@st.cache_resource
+def get_sessions():
+    return get_session_store(scout.summarize_chat)
 
-    {stats_df.to_markdown()}
+SESSION_COOKIE = "scout_session"
 
+# Id of this browser session, kept in a cookie so its saved reports and chats survive a server restart.
+# It is deliberately not in the URL: a shared link or a copied tab would share the session with it.
+def session_id():
+    sid = st.session_state.get('session_id')
+    if sid is None:
+        # Only an id this app could have issued is taken back; it is echoed into the cookie script
+        sid = st.context.cookies.get(SESSION_COOKIE)
+        if not isinstance(sid, str) or not re.fullmatch(r"[0-9a-f]{32}", sid):
+            sid = uuid.uuid4().hex
+        st.session_state.session_id = sid
+    return sid
 
-    Return the scouting report in the following markdown format:
+# Set the session cookie from the browser. Cookies are only read when the page connects, so this is
+# drawn (as an empty frame) on every run of a browser session that arrived without it.
+def remember_session():
+    # Older links carried the id as ?session=; it is never honoured, just dropped from the address bar
+    if "session" in st.query_params:
+        del st.query_params["session"]
+    sid = session_id()
+    if st.context.cookies.get(SESSION_COOKIE) != sid:
+        script = (f"<script>window.parent.document.cookie = "
+                  f"'{SESSION_COOKIE}={sid}; Max-Age={SESSION_RETENTION}; Path=/; SameSite=Strict';</script>")
+        if hasattr(st, "iframe"):
+            st.iframe(script, height=1)
+        else:
+            components.html(script, height=0)
 
-    ## {player_name} Scouting Report
+remember_session()
 
-    ### Strengths
-    < a list of 1 to 3 strengths >
+# The player this session is looking at, or None before the first report.
+# st.session_state only holds its URL; the report, chat and page live in the session store.
+def current_player():
+    if 'current_url' not in st.session_state:
+        # After a restart, pick up where the session left off
+        recent = get_sessions().players(session_id())
+        st.session_state.current_url = recent[0][0] if recent else None
+    return get_sessions().get(session_id(), st.session_state.get('current_url'))
 
-    ### Weaknesses
-    < a list of 1 to 3 weaknesses >
+# Shown when FBref requests queue past the HTTP client's maximum wait
+RATE_LIMITED_NOTE = "FBref is rate-limiting requests right now. Please try again in a minute."
 
-    ### Summary
-    < a brief summary of the player's overall performance and if he would be beneficial to the team >
-    """
-    
-    response = client.chat.completions.create(
-        messages=[
-            {
-                "role": "system",
-                "content": "You are a professional football (soccer) scout.",
-            },
-            {
-                "role": "user",
-                "content": prompt,
-            }
-        ],
-        model="gpt-4.1-mini",
-        temperature=1,
-        max_tokens=4096,
-        top_p=1
-    )
+# Function to wait for the scraped player data of a pipeline lookup
+def get_player_data(lookup):
+    try:
+        return lookup.page_future.result()
     
-    return response.choices[0].message.content
+    except RateLimited:
+        st.warning(RATE_LIMITED_NOTE)
+        return None
+    except Exception as e:
+        st.error(f"Error scraping player data: {str(e)}")
+        return None
 
-# Initialize session state for chat
-if 'chat_messages' not in st.session_state:
-    st.session_state.chat_messages = []
+# Appended to reports and answers whose stream was cut short
+INTERRUPTED_NOTE = "\n\n*(Generation was interrupted before it finished.)*"
 
-# Adding a key value for chat input reset
-if 'chat_input_key' not in st.session_state:
-    st.session_state.chat_input_key = 0
+# Function to render a token stream into a placeholder as it arrives
+# Plain markdown by default; render_html wraps the text in trusted HTML (the chat bubbles)
+def stream_into(placeholder, chunks, parts, render_html=None):
+    def draw(text):
+        if render_html is None:
+            placeholder.markdown(text)
+        else:
+            placeholder.markdown(render_html(text), unsafe_allow_html=True)
 
-# Function to process chat with the scout AI
-def process_chat_with_scout_ai(user_question):
-    if 'chat_context' not in st.session_state:
-        # Create initial context for the conversation
-        player_name = st.session_state.name
-        position = st.session_state.position
-        age = st.session_state.age
-        team = st.session_state.team
-        stats_df = st.session_state.stats_df
-        report = st.session_state.report
-        
-        # Prepare context from player data and report
-        context = f"""
-        Player: {player_name}
-        Position: {position}
-        Age: {age}
-        Team: {team}
-        
-        Statistics:
-        {stats_df.to_markdown()}
-        
-        Scouting Report:
-        {report}
-        """
-        
-        # Create system message with context
-        system_message = {
-            "role": "system", 
-            "content": f"You are a professional football (soccer) scout with deep knowledge about players, tactics, and football analytics. Answer questions about the player based on the provided statistics and scouting report. Be concise but insightful. Respond in a conversational tone. Here is the player information:\n\n{context}"
-        }
-        
-        st.session_state.chat_context = [system_message]
-    
-    # Append user question to context
-    st.session_state.chat_context.append({"role": "user", "content": user_question})
-    
-    # Get response from OpenAI
-    client = get_openai_client()
-    response = client.chat.completions.create(
-        messages=st.session_state.chat_context,
-        model="gpt-4.1-mini",
-        temperature=0.7,
-        max_tokens=2048,
-        top_p=1
+    last_render = 0.0
+    for chunk in chunks:
+        parts.append(chunk)
+        # Redraw at most every 50ms so long answers don't flood the browser with deltas
+        now = time.monotonic()
+        if now - last_render > 0.05:
+            draw("".join(parts))
+            last_render = now
+    text = "".join(parts)
+    draw(text)
+    return text
+
+# Function to generate a player's scouting report, streaming it into placeholder
+# chunks can be a stream the pipeline already started for this player
+def generate_scouting_report(player, placeholder, force=False, chunks=None):
+    # Surface a missing API key in the UI before the report call
+    get_openai_client()
+    parts = []
+    completed = False
+    try:
+        if chunks is None:
+            chunks = scout.stream_scouting_report(
+                player.name, player.position, player.age, player.team, player.stats_df, force=force
+            )
+        stream_into(placeholder, chunks, parts)
+        completed = True
+    finally:
+        # Keep whatever arrived, even if the run was interrupted mid-stream
+        if completed or parts:
+            player.report = "".join(parts)
+            player.report_interrupted = not completed
+            # A new report starts a new conversation
+            player.chat = None
+            get_sessions().save(session_id(), player)
+    return player.report
+
+# Function to create the token-budgeted chat context for a player
+def new_chat_context(player):
+    system_message = chat_system_message(
+        player.name,
+        player.position,
+        player.age,
+        player.team,
+        player.stats_df,
+        player.report
     )
+    return ChatContext(system_message, scout.summarize_chat)
+
+# Function to process chat with the scout AI
+def process_chat_with_scout_ai(player, user_question, usage=None):
+    # Append user question to the conversation
+    player.chat.append("user", user_question)
     
-    assistant_response = response.choices[0].message.content
+    # Stream the response from OpenAI; older turns are summarized if over budget
+    get_openai_client()
+    return scout.stream_chat(player.chat.messages(), usage)
+
+# Function to render one chat message
+def chat_html(role, content):
+    name = "You" if role == "user" else "AI Scout"
+    return f"""
+    <div class="chat-message {role}">
+        <div class="name">{name}</div>
+        <div class="message">{content}</div>
+    </div>
+    """
+
+# Function to answer a chat question, streaming the reply into the transcript
+def answer_question(player, user_question, container):
+    container.markdown(chat_html("user", user_question), unsafe_allow_html=True)
     
-    # Add assistant response to context for conversation continuity
-    st.session_state.chat_context.append({"role": "assistant", "content": assistant_response})
+    # Show typing indicator until the first tokens arrive
+    placeholder = container.empty()
+    placeholder.markdown(chat_html("assistant", "Thinking..."), unsafe_allow_html=True)
     
-    return assistant_response
+    parts = []
+    usage = {}
+    completed = False
+    try:
+        chunks = process_chat_with_scout_ai(player, user_question, usage)
+        stream_into(placeholder, chunks, parts, render_html=lambda text: chat_html("assistant", text))
+        completed = True
+    finally:
+        # Keep partial answers too, so an interrupted reply isn't lost
+        if completed or parts:
+            player.chat.append("assistant", "".join(parts), interrupted=not completed)
+            player.chat.record_usage(usage)
+        get_sessions().save(session_id(), player)
 
-# Function to reset chat input by incrementing the key
-def reset_chat_input():
-    st.session_state.chat_input_key += 1
+# FBref search for names the local index doesn't know, memoized so reruns never repeat it
+@st.cache_data(ttl=3600, show_spinner=False)
+def search_fbref(player_name):
+    return scout.search_player(player_name, use_index=False)
 
-# Interface
-st.title("⚽ AI Football (Soccer) Scout Report")
-st.markdown("Generate professional scouting reports using AI and player statistics from FBRef.")
+# Statistics table for display, indexed by statistic
+@st.cache_data(max_entries=32, show_spinner=False)
+def stats_table(stats_df):
+    return stats_df.set_index('Statistic')
 
-# Create tabs for the main sections
-tab1, tab2 = st.tabs(["📊 Scouting Report", "💬 Chat with Scout AI"])
+# Chat styling, sent once per full page run rather than with every chat turn
+CHAT_CSS = """
+<style>
+.chat-message {
+    padding: 0.75rem;
+    border-radius: 0.5rem;
+    margin-bottom: 0.5rem;
+    display: flex;
+    flex-direction: column;
+}
+/* Dark mode styles */
+[data-theme="dark"] .chat-message.user {
+    background-color: #26272F;
+}
+[data-theme="dark"] .chat-message.assistant {
+    background-color: #101010;
+}
+/* Light mode styles */
+[data-theme="light"] .chat-message.user {
+    background-color: #E9EBF1;
+}
+[data-theme="light"] .chat-message.assistant {
+    background-color: #FFFFFF;
+}
+.chat-message .avatar {
+    width: 20px;
+    height: 20px;
+    border-radius: 50%;
+    object-fit: cover;
+    margin-right: 10px;
+}
+.chat-message .message {
+    padding: 0.5rem 0;
+}
+.chat-message .name {
+    font-weight: bold;
+    font-size: 0.8rem;
+    color: #888;
+    margin-bottom: 0.5rem;
+}
+.stContainer {
+    margin-top: 0;
+    padding-top: 0;
+}
+</style>
+"""
 
-with tab1:
+# Report tab as a fragment: its widgets rerun only this function, not the chat or compare tabs
+@st.fragment
+def report_tab():
     col1, col2 = st.columns([1, 2])
 
-    def generate_report(get_player_data, generate_scouting_report, player_url):
+    def generate_report(player_url):
         # Check if we already have a report for this URL
         if 'current_url' in st.session_state and st.session_state.current_url == player_url:
             return
+        
+        # A player this session looked at before comes back from the session store with its chat
+        saved = get_sessions().get(session_id(), player_url)
+        # An interrupted report is not reused; the pipeline streams it again, normally from the LLM cache
+        if saved is not None and saved.report and not saved.report_interrupted:
+            st.session_state.current_url = player_url
+            st.rerun()
             
+        # Page fetch, parsing, headshot download and report generation overlap in the pipeline
+        get_openai_client()
+        lookup = get_pipeline().start(player_url)
+        
         with st.spinner("Fetching player data..."):
-            name, position, age, team, photo_url, stats_df = get_player_data(player_url)
+            page = get_player_data(lookup)
                             
-            if stats_df is not None:
-                st.session_state.name = name
-                st.session_state.position = position
-                st.session_state.age = age
-                st.session_state.team = team
-                st.session_state.stats_df = stats_df
-                st.session_state.photo_url = photo_url
+            if page is not None:
+                player = PlayerSession.from_page(player_url, page)
                 st.session_state.current_url = player_url
-                                
-                # Generate report
-                with st.spinner("Generating scouting report..."):
-                    report = generate_scouting_report(name, position, age, team, stats_df)
-                    st.session_state.report = report
                     
-                # Reset chat when a new player is loaded
-                st.session_state.chat_messages = []
-                if 'chat_context' in st.session_state:
-                    del st.session_state.chat_context
+                # Generate report, streaming it into the report column
+                with st.spinner("Generating scouting report..."):
+                    generate_scouting_report(player, col2.empty(), chunks=lookup.report_chunks())
+                
+                # The headshot has normally arrived while the report was streaming
+                try:
+                    lookup.done.result(timeout=10)
+                except Exception:
+                    pass
+                player.photo = lookup.photo
                                 
                 st.success("Report generated!")
 
-                # Switch to scouting report tab
+                # A new player changes every tab, so rerun the whole page
                 st.rerun()
             else:
                 st.error("Failed to fetch player data. Check the URL and try again.")
@@ -255,273 +317,330 @@ with tab1:
         input_method = st.radio("Choose input method:", ["Player Name", "FBRef URL"])
         
         if input_method == "Player Name":
-            player_name = st.text_input("Enter player full name (First and Last name)")
+            # Only a submitted name is looked up, not every keystroke
+            with st.form("player_search", border=False):
+                query = st.text_input("Enter player full name (First and Last name)")
+                submitted = st.form_submit_button("Search")
+            if submitted and query.strip():
+                st.session_state.player_query = query.strip()
+                # Ranked matches from players we've already seen, fixed for this search;
+                # only an unambiguous exact match is used without asking
+                st.session_state.player_resolved = get_player_index().resolve(query.strip())
+                st.session_state.player_candidates = get_player_index().lookup(query.strip())
+            
+            player_name = st.session_state.get('player_query')
             if player_name:
-                st.info(f"Looking up {player_name}...")
-                # Search for player on FBRef
-                search_url = f"https://fbref.com/search/search.fcgi?search={player_name.replace(' ', '+')}"
-                try:
-                    response = requests.get(search_url)
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                    
-                    # Find the first player link in the search results
-                    player_link = soup.select_one('a[href*="/en/players/"]')
-                    if player_link:
-                        player_url = f"{player_link['href']}"
-                        st.success(f"Player found: {player_name}. Using URL: {player_url}")
+                resolved = st.session_state.player_resolved
+                candidates = st.session_state.player_candidates
+                choice = None
+                if candidates and not resolved:
+                    labels = [name for name, _, _ in candidates] + [f'Search FBRef for "{player_name}"']
+                    choice = st.selectbox(
+                        "Matching players",
+                        range(len(labels)),
+                        index=None,
+                        placeholder="Choose a player...",
+                        format_func=labels.__getitem__,
+                        # A new search never inherits the pick made for the previous one
+                        key=f"player_choice_{player_name}"
+                    )
+                if candidates and not resolved and choice is None:
+                    # Wait for an explicit pick rather than scraping and reporting on a guess
+                    st.caption("Pick the player you meant to generate their report.")
+                else:
+                    st.info(f"Looking up {player_name}...")
+                    try:
+                        if resolved:
+                            player_url = resolved
+                        elif candidates and choice < len(candidates):
+                            player_url = candidates[choice][1]
+                        else:
+                            # Search for player on FBRef and use the first player link in the results
+                            player_url = search_fbref(player_name)
+                        if player_url:
+                            st.success(f"Player found: {player_name}. Using URL: {player_url}")
                         
-                        # Automatically populate the URL input field
-                        st.session_state.player_url = player_url
+                            # Automatically populate the URL input field
+                            st.session_state.player_url = player_url
 
-                        # Generate report automatically when player is found
-                        generate_report(get_player_data, generate_scouting_report, player_url)
+                            # The search is finished once its player loads; keeping it would reload that player
+                            # on every rerun and undo a switch from the Recent players selector
+                            for key in ('player_query', 'player_resolved', 'player_candidates'):
+                                st.session_state.pop(key, None)
 
-                    else:
-                        st.error("Player not found. Please refine your search.")
-                except Exception as e:
-                    st.error(f"Error searching for player: {str(e)}")
+                            # Generate report automatically when player is found
+                            generate_report(player_url)
+
+                        else:
+                            st.error("Player not found. Please refine your search.")
+                    except RateLimited:
+                        st.warning(RATE_LIMITED_NOTE)
+                    except Exception as e:
+                        st.error(f"Error searching for player: {str(e)}")
         else:
             player_url = st.text_input("Enter FBRef player URL", 
                                     "https://fbref.com/en/players/3423f250/Raphinha")
             
         if st.button("Generate Report", type="primary"):
             if input_method == "FBRef URL" and player_url:
-                generate_report(get_player_data, generate_scouting_report, player_url)
+                generate_report(player_url)
             else:
                 st.error("Please enter a valid FBRef URL")
+        
+        # Players this session looked at before; picking one reloads its report and chat
+        recent = get_sessions().players(session_id())
+        current_url = st.session_state.get('current_url')
+        if len(recent) > 1:
+            names = dict(recent)
+            urls = list(names)
+            recent_url = st.selectbox(
+                "Recent players",
+                urls,
+                index=urls.index(current_url) if current_url in names else None,
+                format_func=names.get
+            )
+            if recent_url and recent_url != current_url:
+                st.session_state.current_url = recent_url
+                st.rerun()
 
     # Display report if it exists
+    player = current_player()
+    if player is not None and player.report_interrupted and st.session_state.get('resumed_url') != player.url:
+        # Reopened after its stream was cut short: finish it once (the LLM cache usually has the full
+        # text); if that fails too the partial report is shown with a note and can be regenerated
+        st.session_state.resumed_url = player.url
+        with col2, st.spinner("Generating scouting report..."):
+            generate_scouting_report(player, st.empty())
+        st.rerun()
     with col2:
-        if 'report' in st.session_state:
+        if player is not None and player.report:
             # Display photo and player details side by side
-            if 'photo_url' in st.session_state:
-                col2_1, col2_2 = st.columns([1, 3])
-                
-                with col2_1:
-                    if st.session_state.photo_url:
-                        try:
-                            st.image(st.session_state.photo_url, width=120)
-                        except Exception as e:
-                            st.warning(f"Error displaying image: {str(e)}")
-                
-                with col2_2:
-                    st.markdown(f"""
-                    **Position:** {st.session_state.position}\n
-                    **Age:** {st.session_state.age}\n
-                    **Team:** {st.session_state.team}
-                    """)
+            col2_1, col2_2 = st.columns([1, 3])
+            
+            with col2_1:
+                # Local thumbnail from the photo cache; a placeholder when there is no photo
+                try:
+                    st.image(player.photo or placeholder_photo(), width=120)
+                except Exception:
+                    st.image(placeholder_photo(), width=120)
+            
+            with col2_2:
+                st.markdown(f"""
+                **Position:** {player.position}\n
+                **Age:** {player.age}\n
+                **Team:** {player.team}
+                """)
             
-            st.markdown(st.session_state.report)
+            report = player.report + (INTERRUPTED_NOTE if player.report_interrupted else "")
+            st.markdown(report)
             
             # Add download button
             st.download_button(
                 label="Download Report",
-                data=st.session_state.report,
-                file_name=f"{st.session_state.name}_report.md",
+                data=report,
+                file_name=f"{player.name}_report.md",
                 mime="text/markdown"
             )
             
+            # Bypass the shared report cache and ask the model for a fresh report
+            if st.button("Regenerate Report"):
+                with st.spinner("Generating scouting report..."):
+                    generate_scouting_report(player, st.empty(), force=True)
+                # The chat was reset, so rerun the whole page
+                st.rerun()
+            
             # Display the raw data
             with st.expander("View Player Statistics"):
-                st.dataframe(st.session_state.stats_df.set_index('Statistic'), use_container_width=True)
+                st.dataframe(stats_table(player.stats_df), use_container_width=True)
+                
+                # Every other table on the player's page; each is only parsed once someone picks it
+                tables = player.tables
+                if len(tables) > 1:
+                    table_id = st.selectbox(
+                        "More tables from FBRef",
+                        [None] + tables.ids(),
+                        format_func=lambda table_id: "Choose a table..." if table_id is None else tables.caption(table_id)
+                    )
+                    if table_id:
+                        st.dataframe(tables.get(table_id), use_container_width=True, hide_index=True)
 
-# Chat Interface tab
-with tab2:
-    if 'report' not in st.session_state:
-        st.info("👈 Please generate a scouting report first to chat with the AI Scout")
-    else:
-        st.subheader(f"💬 Chat with AI Scout about {st.session_state.name}")
+# Rerun only the chat fragment to show the updated transcript. Fragment-scoped reruns are refused
+# while the chat is drawn as part of a full page run (e.g. under AppTest), so fall back to a full one.
+def rerun_chat():
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+# Chat tab as a fragment: a question and its answer rerun only this function, never the report path
+@st.fragment
+def chat_tab():
+    player = current_player()
+    st.subheader(f"💬 Chat with AI Scout about {player.name}")
+    
+    # Start the conversation with a message from the assistant
+    if player.chat is None:
+        player.chat = new_chat_context(player)
+        initial_message = f"Hi! I'm your AI football scout. I've analyzed {player.name}'s stats and created the scouting report. What would you like to know about this player?"
+        player.chat.append("assistant", initial_message)
+        get_sessions().save(session_id(), player)
+
+    # The transcript goes out as one element instead of one per message
+    chat_container = st.container()
+    with chat_container:
+        st.markdown(
+            "".join(
+                chat_html(message["role"], message["content"] + (INTERRUPTED_NOTE if message.get("interrupted") else ""))
+                for message in player.chat.history
+            ),
+            unsafe_allow_html=True
+        )
+    
+    # Chat input; the form clears the text box once the question is sent
+    with st.form("chat_form", clear_on_submit=True, border=False):
+        col1, col2 = st.columns([6, 1])
+        with col1:
+            user_question = st.text_input(
+                "Question",
+                placeholder="Ask a question about the player...",
+                label_visibility="collapsed"
+            )
+        with col2:
+            send_button = st.form_submit_button("Send", use_container_width=True)
+    
+    # Prompt size of the last request, to check what the token budget saves
+    if player.chat.requests:
+        last_request = player.chat.requests[-1]
+        usage_note = f"Last request: ~{last_request['prompt_tokens']} prompt tokens"
+        if last_request.get("api_prompt_tokens"):
+            usage_note += f" ({last_request['api_prompt_tokens']} reported by the API)"
+        usage_note += f", {last_request['unbudgeted_tokens']} if the full history were resent"
+        st.caption(usage_note)
+    
+    if send_button and user_question:
+        # Stream the AI response into the transcript
+        answer_question(player, user_question, chat_container)
         
-        # Chat interface styling
-        st.markdown("""
-        <style>
-        .chat-message {
-            padding: 0.75rem;
-            border-radius: 0.5rem;
-            margin-bottom: 0.5rem;
-            display: flex;
-            flex-direction: column;
-        }
-        /* Dark mode styles */
-        [data-theme="dark"] .chat-message.user {
-            background-color: #26272F;
-        }
-        [data-theme="dark"] .chat-message.assistant {
-            background-color: #101010;
-        }
-        /* Light mode styles */
-        [data-theme="light"] .chat-message.user {
-            background-color: #E9EBF1;
-        }
-        [data-theme="light"] .chat-message.assistant {
-            background-color: #FFFFFF;
-        }
-        .chat-message .avatar {
-            width: 20px;
-            height: 20px;
-            border-radius: 50%;
-            object-fit: cover;
-            margin-right: 10px;
-        }
-        .chat-message .message {
-            padding: 0.5rem 0;
-        }
-        .chat-message .name {
-            font-weight: bold;
-            font-size: 0.8rem;
-            color: #888;
-            margin-bottom: 0.5rem;
-        }
-        .stContainer {
-            margin-top: 0;
-            padding-top: 0;
-        }
-        </style>
-        """, unsafe_allow_html=True)
+        # Rerun the chat to display the updated transcript
+        rerun_chat()
         
-        # Initial message from assistant
-        if not st.session_state.chat_messages:
-            initial_message = f"Hi! I'm your AI football scout. I've analyzed {st.session_state.name}'s stats and created the scouting report. What would you like to know about this player?"
-            st.session_state.chat_messages.append({"role": "assistant", "content": initial_message})
-            
-            # Initialize chat context
-            if 'chat_context' not in st.session_state:
-                player_name = st.session_state.name
-                position = st.session_state.position
-                age = st.session_state.age
-                team = st.session_state.team
-                stats_df = st.session_state.stats_df
-                report = st.session_state.report
-                
-                # Prepare context from player data and report
-                context = f"""
-                Player: {player_name}
-                Position: {position}
-                Age: {age}
-                Team: {team}
-                
-                Statistics:
-                {stats_df.to_markdown()}
-                
-                Scouting Report:
-                {report}
-                """
-                
-                # Create system message with context
-                system_message = {
-                    "role": "system", 
-                    "content": f"You are a professional football (soccer) scout with deep knowledge about players, tactics, and football analytics. Answer questions about the player based on the provided statistics and scouting report. Be concise but insightful. Respond in a conversational tone. Here is the player information:\n\n{context}"
-                }
-                
-                st.session_state.chat_context = [system_message]
-                st.session_state.chat_context.append({"role": "assistant", "content": initial_message})
-
-        # Chat container with fixed height and scrolling
-        chat_container = st.container()
-        with chat_container:
-            # Create a more compact chat interface
-            for message in st.session_state.chat_messages:
-                if message["role"] == "user":
-                    st.markdown(f"""
-                    <div class="chat-message user">
-                        <div class="name">You</div>
-                        <div class="message">{message['content']}</div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                else:
-                    st.markdown(f"""
-                    <div class="chat-message assistant">
-                        <div class="name">AI Scout</div>
-                        <div class="message">{message['content']}</div>
-                    </div>
-                    """, unsafe_allow_html=True)
-            
-            # Close the scrollable container
-            st.markdown('</div>', unsafe_allow_html=True)
+    # Suggested questions
+    if len(player.chat.history) < 3:
+        st.markdown("### Suggested questions")
+        suggested_questions = [
+            f"What are {player.name}'s top 3 strongest attributes based on the statistics?",
+            f"How would {player.name}'s playing style complement a high-pressing system?",
+            f"Can you analyze {player.name}'s set-piece contribution and aerial ability?",
+            f"What specific technical aspects should {player.name} focus on improving?",
+            f"How does {player.name}'s performance metrics compare to the league's top 5 players?",
+            f"Given {player.name}'s age and current level, what's their potential for the next seasons?"
+        ]
         
-        # Chat input
-        with st.container():
-            col1, col2 = st.columns([6, 1])
-            with col1:
-                # Use a dynamic key for the text input to force a reset
-                user_question = st.text_input(
-                    "", 
-                    placeholder="Ask a question about the player...", 
-                    key=f"chat_input_{st.session_state.chat_input_key}", label_visibility="collapsed"
-                )
-            with col2:
-                send_button = st.button("Send", use_container_width=True, key="send_chat")
-            
-            if send_button and user_question:
-                # Add user question to chat history
-                st.session_state.chat_messages.append({"role": "user", "content": user_question})
-                
-                # Show typing indicator
-                typing_placeholder = st.empty()
-                typing_placeholder.markdown("""
-                <div class="chat-message assistant">
-                    <div class="name">AI Scout</div>
-                    <div class="message">Thinking...</div>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                # Generate AI response
-                ai_response = process_chat_with_scout_ai(user_question)
-                
-                # Remove typing indicator
-                typing_placeholder.empty()
-                
-                # Add AI response to chat history
-                st.session_state.chat_messages.append({"role": "assistant", "content": ai_response})
-                
-                # Reset the chat input by incrementing the key
-                reset_chat_input()
-                
-                # Rerun to display updated chat
-                st.rerun()
-            
-        # Suggested questions
-        if len(st.session_state.chat_messages) < 3:
-            st.markdown("### Suggested questions")
-            suggested_questions = [
-                f"What are {st.session_state.name}'s top 3 strongest attributes based on the statistics?",
-                f"How would {st.session_state.name}'s playing style complement a high-pressing system?",
-                f"Can you analyze {st.session_state.name}'s set-piece contribution and aerial ability?",
-                f"What specific technical aspects should {st.session_state.name} focus on improving?",
-                f"How does {st.session_state.name}'s performance metrics compare to the league's top 5 players?",
-                f"Given {st.session_state.name}'s age and current level, what's their potential for the next seasons?"
-            ]
-            
-            col1, col2 = st.columns(2)
-            with col1:
-                for q in suggested_questions[:3]:
+        col1, col2 = st.columns(2)
+        for column, questions in ((col1, suggested_questions[:3]), (col2, suggested_questions[3:])):
+            with column:
+                for q in questions:
                     if st.button(q, key=f"q_{q[:20]}", use_container_width=True):
-                        # Add user question to chat history
-                        st.session_state.chat_messages.append({"role": "user", "content": q})
+                        # Stream the AI response into the transcript
+                        answer_question(player, q, chat_container)
                         
-                        # Generate AI response
-                        ai_response = process_chat_with_scout_ai(q)
-                        
-                        # Add AI response to chat history
-                        st.session_state.chat_messages.append({"role": "assistant", "content": ai_response})
-                        
-                        # Rerun to display updated chat
-                        st.rerun()
-            
-            with col2:
-                for q in suggested_questions[3:]:
-                    if st.button(q, key=f"q_{q[:20]}", use_container_width=True):
-                        # Add user question to chat history
-                        st.session_state.chat_messages.append({"role": "user", "content": q})
-                        
-                        # Generate AI response
-                        ai_response = process_chat_with_scout_ai(q)
-                        
-                        # Add AI response to chat history
-                        st.session_state.chat_messages.append({"role": "assistant", "content": ai_response})
-                        
-                        # Rerun to display updated chat
-                        st.rerun()
+                        # Rerun the chat to display the updated transcript
+                        rerun_chat()
+
+# Comparison tab as a fragment, so changing filters doesn't rerun the other tabs
+@st.fragment
+def compare_tab():
+    corpus = get_stats_corpus()
+    if len(corpus) == 0:
+        st.info("👈 Generate a scouting report first. Every player you look up is added to the comparison data.")
+    else:
+        labels = {player["url"]: f"{player['name']} ({player['team']})" for player in corpus.players}
+        urls = list(labels)
+        current_url = st.session_state.get('current_url')
+        
+        st.subheader("Compare players")
+        selected = st.multiselect(
+            "Players to compare",
+            urls,
+            default=[current_url] if current_url in labels else [],
+            format_func=labels.get
+        )
+        if selected:
+            st.dataframe(corpus.compare(selected), use_container_width=True)
+        
+        st.subheader("Find similar players")
+        reference = st.selectbox(
+            "Similar to",
+            urls,
+            index=urls.index(current_url) if current_url in labels else 0,
+            format_func=labels.get
+        )
+        filter_col1, filter_col2, filter_col3 = st.columns(3)
+        with filter_col1:
+            position = st.selectbox("Position", ["Any", "GK", "DF", "MF", "FW"])
+        with filter_col2:
+            min_age, max_age = st.slider("Age", 15, 45, (15, 45))
+        with filter_col3:
+            k = st.number_input("Results", min_value=1, max_value=50, value=10)
+        
+        # Only filter on age when the range was narrowed, so players with an unknown age still show up
+        age_filtered = (min_age, max_age) != (15, 45)
+        similar = corpus.similar(
+            reference,
+            k=int(k),
+            position=None if position == "Any" else position,
+            min_age=min_age if age_filtered else None,
+            max_age=max_age if age_filtered else None
+        )
+        st.dataframe(similar, use_container_width=True, hide_index=True)
+
+# Interface
+st.title("⚽ AI Football (Soccer) Scout Report")
+st.markdown("Generate professional scouting reports using AI and player statistics from FBRef.")
+
+# Create tabs for the main sections
+tab1, tab2, tab3 = st.tabs(["📊 Scouting Report", "💬 Chat with Scout AI", "📈 Compare Players"])
+
+with tab1:
+    report_tab()
+
+# Chat Interface tab
+with tab2:
+    player = current_player()
+    if player is None or not player.report:
+        st.info("👈 Please generate a scouting report first to chat with the AI Scout")
+    else:
+        st.markdown(CHAT_CSS, unsafe_allow_html=True)
+        chat_tab()
+
+# Comparison and similar-player search over every player looked up so far
+with tab3:
+    compare_tab()
+
+# Optional diagnostics: per-stage latency, bytes, tokens and cache results for this server process
+with st.sidebar:
+    if st.checkbox("Show diagnostics", value=False):
+        st.subheader("Stage latency")
+        spans = tracing.registry.span_summary()
+        if spans:
+            st.dataframe(spans, use_container_width=True, hide_index=True)
+        else:
+            st.caption("No stages have run yet.")
+        st.subheader("Caches")
+        st.json(
+            {"pages": get_page_cache().stats(), "llm": get_llm_cache().stats(), "photos": get_photo_cache().stats()},
+            expanded=False
+        )
+        st.subheader("Sessions")
+        st.json(get_sessions().stats(), expanded=False)
+        st.subheader("FBref client")
+        st.json(get_http_client().get_stats(), expanded=False)
+        st.download_button(
+            label="Download metrics (Prometheus)",
+            data=tracing.registry.render_prometheus(),
+            file_name="scout_metrics.prom",
+            mime="text/plain"
+        )
 
 # Footer
 st.markdown("---")
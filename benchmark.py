@@ -0,0 +1,308 @@
+import argparse
+import glob
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from multiprocessing import get_context
+
+import fake_servers
+from fake_servers import FIXTURES_DIR
+
+PLAYER_FIXTURES = sorted(glob.glob(os.path.join(FIXTURES_DIR, "players", "*.html")))
+SEARCH_FIXTURES = sorted(glob.glob(os.path.join(FIXTURES_DIR, "search", "*.html")))
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def _fixture_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def _summary(samples):
+    ordered = sorted(samples)
+    return {
+        "runs": len(ordered),
+        "mean_seconds": statistics.fmean(ordered),
+        "p50_seconds": ordered[len(ordered) // 2],
+        "max_seconds": ordered[-1],
+    }
+
+
+# Peak resident memory growth of one parse, measured in a fresh process after imports are warm.
+# Unlike tracemalloc this includes libxml2's allocations, which bypass the Python allocator.
+def _rss_delta(path):
+    import resource
+
+    import pandas as pd
+
+    from fbref_parser import parse_player_page
+
+    pd.read_html(io.StringIO("<table><tr><th>a</th></tr><tr><td>1</td></tr></table>"), flavor="lxml")
+    html = _read(path)
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    parse_player_page(html)
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return (after - before) * (1 if sys.platform == "darwin" else 1024)
+
+
+def bench_parse(repeat, rss):
+    from fbref_parser import parse_player_page, parse_search_results
+
+    fixtures = {}
+    total_pages = 0
+    total_seconds = 0.0
+    pool = get_context("spawn").Pool(1) if rss else None
+    try:
+        for path in PLAYER_FIXTURES:
+            html = _read(path)
+            page = parse_player_page(html)
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                parse_player_page(html)
+                samples.append(time.perf_counter() - start)
+            tracemalloc.start()
+            parse_player_page(html)
+            peak_python = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            result = dict(
+                _summary(samples),
+                bytes=len(html.encode("utf-8")),
+                position=page.position,
+                stats_rows=len(page.stats_df),
+                tables=len(page.tables),
+                has_photo=page.photo_url is not None,
+                peak_python_bytes=peak_python,
+            )
+            if pool is not None:
+                result["peak_rss_delta_bytes"] = pool.apply(_rss_delta, (path,))
+            fixtures[_fixture_name(path)] = result
+            total_pages += len(samples)
+            total_seconds += sum(samples)
+    finally:
+        if pool is not None:
+            pool.close()
+
+    search_pages = 0
+    search_seconds = 0.0
+    for path in SEARCH_FIXTURES:
+        html = _read(path)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            parse_search_results(html)
+        search_seconds += time.perf_counter() - start
+        search_pages += repeat
+
+    return {
+        "player_pages_per_sec": total_pages / total_seconds,
+        "search_pages_per_sec": search_pages / search_seconds,
+        "fixtures": fixtures,
+    }
+
+
+def bench_prompts(repeat):
+    from chat_context import count_tokens
+    from fbref_parser import parse_player_page
+    from prompts import chat_system_message, report_messages
+
+    report = " ".join(fake_servers.REPORT_WORDS * 20)
+    fixtures = {}
+    for path in PLAYER_FIXTURES:
+        page = parse_player_page(_read(path))
+        args = (page.name, page.position, page.age, page.team, page.stats_df)
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            messages = report_messages(*args)
+        report_seconds = (time.perf_counter() - start) / repeat
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            system = chat_system_message(*args, report)
+        chat_seconds = (time.perf_counter() - start) / repeat
+
+        fixtures[_fixture_name(path)] = {
+            "report_build_us": report_seconds * 1e6,
+            "chat_build_us": chat_seconds * 1e6,
+            "report_prompt_tokens": sum(count_tokens(m["content"]) for m in messages),
+            "chat_prompt_tokens": count_tokens(system["content"]),
+        }
+    return {
+        "report_build_us": statistics.fmean(f["report_build_us"] for f in fixtures.values()),
+        "chat_build_us": statistics.fmean(f["chat_build_us"] for f in fixtures.values()),
+        "fixtures": fixtures,
+    }
+
+
+# Time full lookups through the pipeline the app uses, from query to finished report.
+#   cold:        page and LLM caches empty
+#   warm_pages:  FBref pages cached, report regenerated
+#   cached:      everything answered from the caches
+def bench_end_to_end(fbref_root, runs):
+    from llm_cache import get_llm_cache
+    from page_cache import get_page_cache
+    from pipeline import get_pipeline
+
+    queries = [
+        f"{fbref_root}/en/players/{_fixture_name(path).split('-', 1)[0]}/{_fixture_name(path).split('-', 1)[1]}"
+        for path in PLAYER_FIXTURES
+    ]
+    scenarios = {"cold": [], "warm_pages": [], "cached": []}
+    first_token = {"cold": [], "warm_pages": [], "cached": []}
+    stages = {}
+
+    def run(query, force):
+        start = time.perf_counter()
+        lookup = get_pipeline().start(query, force=force)
+        first = None
+        for _ in lookup.report_chunks():
+            if first is None:
+                first = time.perf_counter() - start
+        lookup.done.result()
+        return time.perf_counter() - start, first, lookup
+
+    for _ in range(runs):
+        for query in queries:
+            get_page_cache().clear()
+            get_llm_cache().clear()
+            for scenario, force in (("cold", False), ("warm_pages", True), ("cached", False)):
+                seconds, first, lookup = run(query, force)
+                scenarios[scenario].append(seconds)
+                first_token[scenario].append(first or seconds)
+                if scenario == "cold":
+                    for stage, at in lookup.timings.items():
+                        stages.setdefault(stage, []).append(at)
+
+    # Name search against FBref itself, skipping the local index that now knows every fixture
+    import scout
+
+    get_page_cache().clear()
+    start = time.perf_counter()
+    scout.search_player("van Dijk", use_index=False)
+    search_seconds = time.perf_counter() - start
+
+    results = {
+        scenario: dict(_summary(samples), first_token_p50_seconds=sorted(first_token[scenario])[len(samples) // 2])
+        for scenario, samples in scenarios.items()
+    }
+    results["cold_stage_p50_seconds"] = {stage: sorted(v)[len(v) // 2] for stage, v in stages.items()}
+    results["search_seconds"] = search_seconds
+    return results
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Flatten nested results into {"parse.player_pages_per_sec": value, ...} for comparison
+def _flatten(results, prefix=""):
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, path + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+# Metrics that got worse than baseline by more than tolerance (a fraction), as (name, old, new)
+def regressions(baseline, current, tolerance):
+    old = _flatten(baseline)
+    new = _flatten(current)
+    worse = []
+    for name, value in new.items():
+        if name not in old or not old[name]:
+            continue
+        if name.endswith("_per_sec"):
+            change = (old[name] - value) / old[name]
+        elif name.endswith(("_seconds", "_us", "_bytes")):
+            change = (value - old[name]) / old[name]
+        else:
+            continue
+        if change > tolerance:
+            worse.append((name, old[name], value))
+    return worse
+
+
+# Usage: python benchmark.py --out bench.json
+#        python benchmark.py --compare main.json --tolerance 0.15
+# Runs fully offline against fixtures/fbref and a fake OpenAI server; prints JSON results.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline performance benchmarks for the scouting app.")
+    parser.add_argument("--repeat", type=int, default=20, help="iterations per parse and prompt-build measurement")
+    parser.add_argument("--e2e-runs", type=int, default=3, help="end-to-end passes over every fixture")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake OpenAI seconds before the first token")
+    parser.add_argument("--tokens", type=int, default=400, help="fake OpenAI completion tokens")
+    parser.add_argument("--token-delay", type=float, default=0.001, help="fake OpenAI seconds between tokens")
+    parser.add_argument("--no-rss", action="store_true", help="skip per-parse RSS measurement in a subprocess")
+    parser.add_argument("--out", help="write results to this JSON file as well as stdout")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run; exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed fractional slowdown")
+    args = parser.parse_args()
+
+    fbref = fake_servers.serve(fake_servers.FakeFBrefHandler)
+    openai = fake_servers.serve(fake_servers.FakeOpenAIHandler, latency=args.latency,
+                                tokens=args.tokens, token_delay=args.token_delay)
+    fbref_root = f"http://127.0.0.1:{fbref.server_port}"
+    # Settings are read at import time, so point everything at the fakes before importing the app modules
+    os.environ.update({
+        "SCOUT_FBREF_ROOT": fbref_root,
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{openai.server_port}/v1",
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "benchmark"),
+        "SCOUT_CACHE_DIR": tempfile.mkdtemp(prefix="scout-bench-"),
+    })
+
+    import tracing
+    from http_client import get_http_client
+
+    # The fake FBref has no crawl limit
+    get_http_client().bucket.configure(rate=1e6, capacity=1e6)
+
+    results = {
+        "parse": bench_parse(args.repeat, rss=not args.no_rss),
+        "prompt_build": bench_prompts(args.repeat),
+        "end_to_end": bench_end_to_end(fbref_root, args.e2e_runs),
+    }
+    output = {
+        "meta": {
+            "revision": _git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": vars(args),
+        },
+        "results": results,
+        "spans": tracing.registry.span_summary(),
+    }
+    text = json.dumps(output, indent=2, ensure_ascii=False)
+    print(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        worse = regressions(baseline, results, args.tolerance)
+        for name, old, new in worse:
+            print(f"REGRESSION {name}: {old:.6g} -> {new:.6g}", file=sys.stderr)
+        sys.exit(1 if worse else 0)
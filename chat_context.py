@@ -0,0 +1,128 @@
+from settings import CHAT_FOLD_TARGET, CHAT_KEEP_RECENT, CHAT_TOKEN_BUDGET
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:
+    # tiktoken missing or its encoding can't be loaded offline; fall back to an estimate
+    _encoding = None
+
+# Tokens the chat format adds around every message
+MESSAGE_OVERHEAD = 4
+
+
+def count_tokens(text):
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def message_tokens(message):
+    return count_tokens(message["content"]) + MESSAGE_OVERHEAD
+
+
+# Conversation state for the Scout AI chat, kept within a prompt token budget.
+# history is the whole conversation as the user saw it and the only copy of it; requests send
+# the system context and the most recent turns verbatim, with older turns folded into a running
+# summary by the summarize callback. Going over the budget folds down to fold_target of it, so
+# the next few turns fit without another summarize call.
+class ChatContext:
+    def __init__(self, system_message, summarize, budget=CHAT_TOKEN_BUDGET, keep_recent=CHAT_KEEP_RECENT,
+                 fold_target=CHAT_FOLD_TARGET):
+        self.system_message = system_message
+        self.summarize = summarize
+        self.budget = budget
+        self.keep_recent = keep_recent
+        self.fold_target = fold_target
+        self.summary = ""
+        self.history = []
+        # history[:folded] is represented by the summary in requests
+        self.folded = 0
+        self._turn_tokens = []
+        self._system_tokens = message_tokens(system_message)
+        # One entry per request sent to the model, for checking what the budget saves
+        self.requests = []
+
+    # interrupted marks an answer whose stream was cut short
+    def append(self, role, content, interrupted=False):
+        message = {"role": role, "content": content}
+        if interrupted:
+            message["interrupted"] = True
+        self.history.append(message)
+        self._turn_tokens.append(message_tokens(message))
+
+    # Turns still sent verbatim
+    @property
+    def turns(self):
+        return [{"role": m["role"], "content": m["content"]} for m in self.history[self.folded:]]
+
+    def _summary_message(self):
+        return {"role": "system", "content": f"Summary of the earlier conversation:\n{self.summary}"}
+
+    def token_count(self):
+        total = self._system_tokens + sum(self._turn_tokens[self.folded:])
+        if self.summary:
+            total += message_tokens(self._summary_message())
+        return total
+
+    # Once the prompt is over the budget, fold the oldest turns into the summary until it is
+    # back under fold_target of the budget
+    def _fit(self):
+        live = len(self.history) - self.folded
+        if self.token_count() <= self.budget or live <= self.keep_recent:
+            return 0
+        excess = self.token_count() - int(self.budget * self.fold_target)
+        folded = 0
+        freed = 0
+        while live - folded > self.keep_recent and freed < excess:
+            freed += self._turn_tokens[self.folded + folded]
+            folded += 1
+        self.summary = self.summarize(self.summary, self.turns[:folded])
+        self.folded += folded
+        return folded
+
+    # Messages to send for the next request, with the token accounting recorded
+    def messages(self):
+        folded = self._fit()
+        messages = [self.system_message]
+        if self.summary:
+            messages.append(self._summary_message())
+        messages.extend(self.turns)
+        self.requests.append({
+            "prompt_tokens": self.token_count(),
+            # What the prompt would be if the whole conversation were resent
+            "unbudgeted_tokens": self._system_tokens + sum(self._turn_tokens),
+            "folded_turns": folded,
+        })
+        return messages
+
+    # Actual prompt token usage reported by the API for the last request
+    def record_usage(self, usage):
+        if self.requests and usage:
+            self.requests[-1]["api_prompt_tokens"] = usage.get("prompt_tokens")
+            self.requests[-1]["api_completion_tokens"] = usage.get("completion_tokens")
+
+    # Plain-data snapshot for persisting the conversation
+    def to_state(self):
+        return {
+            "system_message": self.system_message,
+            "summary": self.summary,
+            "history": self.history,
+            "folded": self.folded,
+            "requests": self.requests,
+        }
+
+    @classmethod
+    def from_state(cls, state, summarize, **kwargs):
+        context = cls(state["system_message"], summarize, **kwargs)
+        for message in state["history"]:
+            context.append(message["role"], message["content"], message.get("interrupted", False))
+        context.summary = state["summary"]
+        context.folded = state["folded"]
+        context.requests = state["requests"]
+        return context
+
+    # Approximate memory held by the conversation, in bytes of text
+    def size(self):
+        return (len(self.system_message["content"]) + len(self.summary)
+                + sum(len(message["content"]) for message in self.history))
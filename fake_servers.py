@@ -0,0 +1,168 @@
+import argparse
+import glob
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "fbref")
+# Any image will do for headshots; the README screenshot is already in the repo
+HEADSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "thumb.png")
+
+PLAYER_PATH_RE = re.compile(r"^/en/players/([0-9a-f]{8})(?:/|$)")
+
+REPORT_WORDS = (
+    "He combines sharp movement with composure in front of goal and presses with real intent. "
+    "His numbers against positional peers point to a high-volume, high-efficiency profile, "
+    "though the defensive output is modest and aerial duels are not a strength. "
+).split()
+
+
+def _slug(text):
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+
+# Local stand-in for fbref.com serving the recorded fixtures:
+#   /search/search.fcgi?search=<q>  fixtures/fbref/search/<slug of q>.html, or the no-results page
+#   /en/players/<id>/<slug>         fixtures/fbref/players/<id>-*.html
+#   /req/.../headshots/...          a static image
+class FakeFBrefHandler(BaseHTTPRequestHandler):
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        parsed = urlparse(self.path)
+        if parsed.path == "/search/search.fcgi":
+            query = parse_qs(parsed.query).get("search", [""])[0]
+            path = os.path.join(FIXTURES_DIR, "search", f"{_slug(query)}.html")
+            if not os.path.exists(path):
+                path = os.path.join(FIXTURES_DIR, "search", "no-results.html")
+            with open(path, "rb") as f:
+                return self._send(200, f.read(), "text/html; charset=utf-8")
+        match = PLAYER_PATH_RE.match(parsed.path)
+        if match:
+            paths = glob.glob(os.path.join(FIXTURES_DIR, "players", f"{match.group(1)}-*.html"))
+            if paths:
+                with open(paths[0], "rb") as f:
+                    return self._send(200, f.read(), "text/html; charset=utf-8")
+        if "/headshots/" in parsed.path:
+            with open(HEADSHOT_PATH, "rb") as f:
+                return self._send(200, f.read(), "image/png")
+        self._send(404, b"Not found", "text/plain")
+
+    def log_message(self, *args):
+        pass
+
+
+# Minimal OpenAI-compatible /v1/chat/completions: waits `latency` seconds before the first token,
+# then emits `tokens` words (one per chunk when streaming), `token_delay` seconds apart
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    def _completion_text(self):
+        count = self.server.tokens
+        return " ".join(REPORT_WORDS[i % len(REPORT_WORDS)] for i in range(count))
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_response(404)
+            self.end_headers()
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        prompt_chars = sum(len(message.get("content") or "") for message in request.get("messages", []))
+        prompt_tokens = prompt_chars // 4 + 1
+        completion_tokens = self.server.tokens
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        model = request.get("model", "fake")
+        time.sleep(self.server.latency)
+
+        if not request.get("stream"):
+            if self.server.token_delay:
+                time.sleep(self.server.token_delay * completion_tokens)
+            body = json.dumps({
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": self._completion_text()}}],
+                "usage": usage,
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        def event(choices, usage=None):
+            payload = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                       "model": model, "choices": choices, "usage": usage}
+            self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        words = self._completion_text().split(" ")
+        for i, word in enumerate(words):
+            delta = {"content": word if i == 0 else " " + word}
+            if i == 0:
+                delta["role"] = "assistant"
+            event([{"index": 0, "delta": delta, "finish_reason": None}])
+            if self.server.token_delay:
+                time.sleep(self.server.token_delay)
+        event([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        if (request.get("stream_options") or {}).get("include_usage"):
+            event([], usage)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+# Start a fake server on a background thread; port 0 picks a free port (see server.server_port)
+def serve(handler, port=0, **config):
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    server.latency = config.get("latency", 0.0)
+    server.tokens = config.get("tokens", 600)
+    server.token_delay = config.get("token_delay", 0.0)
+    threading.Thread(target=server.serve_forever, name=handler.__name__, daemon=True).start()
+    return server
+
+
+# Usage: python fake_servers.py --fbref-port 8001 --openai-port 8002 --latency 0.5 --tokens 600
+# then run the app with SCOUT_FBREF_ROOT=http://127.0.0.1:8001 OPENAI_BASE_URL=http://127.0.0.1:8002/v1
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve recorded FBref pages and a fake OpenAI API locally.")
+    parser.add_argument("--fbref-port", type=int, default=8001)
+    parser.add_argument("--openai-port", type=int, default=8002)
+    parser.add_argument("--fbref-latency", type=float, default=0.0, help="seconds added to every FBref response")
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before the first OpenAI token")
+    parser.add_argument("--tokens", type=int, default=600, help="completion tokens per OpenAI response")
+    parser.add_argument("--token-delay", type=float, default=0.005, help="seconds between streamed tokens")
+    args = parser.parse_args()
+
+    fbref = serve(FakeFBrefHandler, args.fbref_port, latency=args.fbref_latency)
+    openai = serve(FakeOpenAIHandler, args.openai_port, latency=args.latency,
+                   tokens=args.tokens, token_delay=args.token_delay)
+    # Flushed, so a parent process reading a pipe sees them as soon as the servers are listening
+    print(f"SCOUT_FBREF_ROOT=http://127.0.0.1:{fbref.server_port}", flush=True)
+    print(f"OPENAI_BASE_URL=http://127.0.0.1:{openai.server_port}/v1", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,162 @@
+import io
+import re
+import threading
+from collections import namedtuple
+from datetime import datetime
+
+import lxml.html
+import pandas as pd
+
+from settings import FBREF_ROOT
+from tracing import span
+
+PlayerPage = namedtuple(
+    "PlayerPage", ["name", "position", "birthday", "age", "team", "photo_url", "stats_df", "tables"]
+)
+
+TABLE_OPEN_RE = re.compile(r'<table\b[^>]*?\sid="([^"]+)"', re.IGNORECASE)
+CAPTION_RE = re.compile(r"<caption[^>]*>(.*?)</caption>", re.IGNORECASE | re.DOTALL)
+TAG_RE = re.compile(r"<[^>]+>")
+
+
+# Make FBref relative links absolute
+def absolute_url(href):
+    if href and not href.startswith("http"):
+        return f"{FBREF_ROOT}{href}"
+    return href
+
+
+def _first(doc, xpath):
+    found = doc.xpath(xpath)
+    return found[0] if found else None
+
+
+# Character offsets of every <table id=...> on a page, found with one text scan so that the many
+# tables FBref ships inside HTML comments are included. A DataFrame is only built for a table
+# the first time someone asks for it.
+class PageTables:
+    def __init__(self, html):
+        self._html = html
+        self._lock = threading.Lock()
+        self._frames = {}
+        self.offsets = {}  # table id -> (start, end), in page order
+        for match in TABLE_OPEN_RE.finditer(html):
+            table_id = match.group(1)
+            end = html.find("</table>", match.end())
+            if end < 0 or table_id in self.offsets:
+                continue
+            self.offsets[table_id] = (match.start(), end + len("</table>"))
+
+    def ids(self):
+        return list(self.offsets)
+
+    def __contains__(self, table_id):
+        return table_id in self.offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    # Approximate memory held: the page text plus every table parsed so far
+    def size(self):
+        return len(self._html) + sum(int(df.memory_usage(deep=True).sum()) for df in self._frames.values())
+
+    def fragment(self, table_id):
+        start, end = self.offsets[table_id]
+        return self._html[start:end]
+
+    # Human-readable table title, e.g. "Shooting" for stats_shooting_dom_lg
+    def caption(self, table_id):
+        start, end = self.offsets[table_id]
+        match = CAPTION_RE.search(self._html, start, min(end, start + 2000))
+        if match is None:
+            return table_id
+        text = TAG_RE.sub("", match.group(1)).strip()
+        return text[:-len(" Table")] if text.endswith(" Table") else text
+
+    # DataFrame for one table, parsed on first use and cached
+    def get(self, table_id):
+        with self._lock:
+            df = self._frames.get(table_id)
+            if df is None:
+                df = pd.read_html(io.StringIO(self.fragment(table_id)), flavor="lxml")[0]
+                self._frames[table_id] = df
+            return df
+
+    # Ids of the scouting summaries, one per position group the player is compared against
+    def scout_summaries(self):
+        return [table_id for table_id in self.offsets if table_id.startswith("scout_summary_")]
+
+    # Scouting summary against one position group (e.g. "FW"), or the page's primary one
+    def scout_summary(self, position=None):
+        ids = self.scout_summaries()
+        if not ids:
+            raise ValueError("No scout_summary table found on player page")
+        table_id = f"scout_summary_{position}" if f"scout_summary_{position}" in self.offsets else ids[0]
+        return self.get(table_id).dropna(subset='Statistic')
+
+
+# (name, url) player profile links from an FBref search results page, in result order
+def parse_search_results(html):
+    doc = lxml.html.fromstring(html)
+    results = []
+    seen = set()
+    for link in doc.xpath('//a[contains(@href, "/en/players/")]'):
+        url = absolute_url(link.get("href"))
+        if url not in seen:
+            seen.add(url)
+            results.append((link.text_content().strip(), url))
+    return results
+
+
+# Parse an FBref player page: details from the page header, tables indexed for lazy loading
+def parse_player_page(html):
+    with span("parse_player") as attrs:
+        attrs["bytes"] = len(html)
+        return _parse_player_page(html)
+
+
+# Player details from the #meta block; None if the document doesn't contain them
+def _parse_meta(doc):
+    name_element = _first(doc, "//h1//span")
+    birthday_element = _first(doc, '//span[@id="necro-birth"]')
+    team_element = _first(doc, '//p[contains(string(.), "Club")]')
+    if name_element is None or birthday_element is None or team_element is None:
+        return None
+    name = name_element.text_content().strip()
+
+    position = None
+    position_element = _first(doc, '//p[contains(string(.), "Position:")]')
+    if position_element is not None:
+        text = position_element.text_content()
+        position = text.split("Position:")[1].split("▪")[0].strip()
+
+    birthday = birthday_element.text_content().strip()
+    age = (datetime.now() - datetime.strptime(birthday, '%B %d, %Y')).days // 365
+
+    team = team_element.text_content().split(':')[-1].strip()
+
+    # Headshot first, then fall back to the media-item block
+    photo_url = None
+    photo_element = _first(doc, '//img[contains(@class, "headshot")]')
+    if photo_element is None:
+        photo_element = _first(doc, '//div[contains(concat(" ", normalize-space(@class), " "), " media-item ")]//img')
+    if photo_element is not None and photo_element.get("src"):
+        photo_url = absolute_url(photo_element.get("src"))
+
+    return name, position, birthday, age, team, photo_url
+
+
+def _parse_player_page(html):
+    tables = PageTables(html)
+    stats_df = tables.scout_summary()
+
+    # The player details sit above the first table, so only that part of the page needs a DOM;
+    # fall back to the whole page if the layout ever differs
+    first_table = min(start for start, _ in tables.offsets.values())
+    meta = _parse_meta(lxml.html.fromstring(html[:first_table]))
+    if meta is None:
+        meta = _parse_meta(lxml.html.fromstring(html))
+    if meta is None:
+        raise ValueError("No player details found on player page")
+
+    return PlayerPage(*meta, stats_df, tables)
@@ -0,0 +1,182 @@
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from settings import (
+    FBREF_BURST,
+    FBREF_RATE,
+    HTTP_BACKOFF_BASE,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_MAX_RETRIES,
+    HTTP_MAX_RETRY_AFTER,
+    HTTP_MAX_WAIT,
+    HTTP_POOL_SIZE,
+    HTTP_READ_TIMEOUT,
+)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+USER_AGENT = "AI-Football-Scout/1.0 (+https://github.com/tellosilvam/AI-Football-Scout-Report)"
+
+
+# Raised when a request would have to queue for the rate limit longer than the caller allows
+class RateLimited(requests.RequestException):
+    pass
+
+
+# Process-wide token bucket: `rate` tokens per second, up to `capacity` saved for bursts
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def configure(self, rate=None, capacity=None):
+        with self._lock:
+            self._refill(time.monotonic())
+            if rate is not None:
+                self.rate = rate
+            if capacity is not None:
+                self.capacity = max(1, capacity)
+                self.tokens = min(self.tokens, self.capacity)
+
+    # Block until a token is available, or raise RateLimited rather than wait past max_wait seconds
+    def acquire(self, max_wait=None):
+        deadline = None if max_wait is None else time.monotonic() + max_wait
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1 or self.rate <= 0:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                raise RateLimited(f"FBref rate limit: no request slot free within {max_wait:g}s")
+            time.sleep(wait)
+
+
+# Seconds to wait from a Retry-After header (delta-seconds or HTTP date), if present
+def parse_retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+# One pooled keep-alive session for every FBref request, with timeouts, retries and rate limiting.
+# A request waits at most max_wait seconds for the rate limit (None waits as long as it takes).
+class HttpClient:
+    def __init__(self, rate=FBREF_RATE, burst=FBREF_BURST, pool_size=HTTP_POOL_SIZE,
+                 timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT), max_retries=HTTP_MAX_RETRIES,
+                 backoff_base=HTTP_BACKOFF_BASE, max_retry_after=HTTP_MAX_RETRY_AFTER, max_wait=HTTP_MAX_WAIT):
+        self.timeout = timeout
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_retry_after = max_retry_after
+        self.bucket = TokenBucket(rate, burst)
+
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        # Recent request latencies and counters for get_stats()
+        self._latencies = deque(maxlen=2048)
+        self._counters = {"requests": 0, "retries": 0, "errors": 0}
+        self._metrics_lock = threading.Lock()
+
+    def _record(self, seconds, outcome):
+        with self._metrics_lock:
+            self._latencies.append(seconds)
+            self._counters["requests"] += 1
+            if outcome != "ok":
+                self._counters[outcome] += 1
+
+    def _backoff(self, attempt):
+        # Exponential backoff with full jitter
+        return random.uniform(0, self.backoff_base * (2 ** attempt))
+
+    def get(self, url, headers=None, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        attempt = 0
+        while True:
+            self.bucket.acquire(self.max_wait)
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, headers=headers, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    self._record(time.perf_counter() - start, "errors")
+                    raise
+                self._record(time.perf_counter() - start, "retries")
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+
+            if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                outcome = "ok" if response.ok or response.status_code == 304 else "errors"
+                self._record(time.perf_counter() - start, outcome)
+                return response
+
+            delay = parse_retry_after(response.headers.get("Retry-After"))
+            if delay is not None and delay > self.max_retry_after:
+                # Asked to back off longer than a user should wait; give up now
+                self._record(time.perf_counter() - start, "errors")
+                return response
+            self._record(time.perf_counter() - start, "retries")
+            response.close()
+            time.sleep(delay if delay is not None else self._backoff(attempt))
+            attempt += 1
+
+    # Request counters and latency percentiles (seconds) over the recent window
+    def get_stats(self):
+        with self._metrics_lock:
+            latencies = sorted(self._latencies)
+            stats = dict(self._counters)
+        stats.update(
+            p50=_percentile(latencies, 0.50),
+            p95=_percentile(latencies, 0.95),
+            p99=_percentile(latencies, 0.99),
+            max=latencies[-1] if latencies else 0.0,
+        )
+        return stats
+
+
+_http_client = None
+_http_client_lock = threading.Lock()
+
+
+# Process-wide client shared by every session and worker thread
+def get_http_client():
+    global _http_client
+    if _http_client is None:
+        with _http_client_lock:
+            if _http_client is None:
+                _http_client = HttpClient()
+    return _http_client
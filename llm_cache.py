@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import time
+
+from settings import CACHE_DIR, LLM_CACHE_MAX_AGE, LLM_CACHE_MAX_BYTES
+from single_flight import get_single_flight
+from sqlite_cache import LRUCache, process_instance
+from tracing import annotate, first_token
+
+
+# Content address for a completion request: model, sampling parameters and every message
+def request_key(model, messages, **params):
+    payload = json.dumps(
+        {"model": model, "messages": messages, "params": params},
+        sort_keys=True, ensure_ascii=False, separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# Persistent cache of LLM completions shared by every session and process
+class LLMCache(LRUCache):
+    table = "completions"
+    key = "key"
+
+    def __init__(self, path=None, max_bytes=None, max_age=None):
+        super().__init__(
+            path or os.path.join(CACHE_DIR, "llm.sqlite3"),
+            """
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                content TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            """,
+            max_bytes if max_bytes is not None else LLM_CACHE_MAX_BYTES
+        )
+        self.max_age = max_age if max_age is not None else LLM_CACHE_MAX_AGE
+
+    # Cached completion text for key, or None when missing or too old.
+    # count=False re-checks without skewing the hit rate.
+    def get(self, key, count=True):
+        conn = self.connect()
+        now = time.time()
+        row = conn.execute(
+            "SELECT content, created_at FROM completions WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or now - row[1] > self.max_age:
+            if count:
+                self._count(conn, "misses")
+            return None
+        conn.execute("UPDATE completions SET last_access = ? WHERE key = ?", (now, key))
+        if count:
+            self._count(conn, "hits")
+        return row[0]
+
+    def put(self, key, model, content):
+        conn = self.connect()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO completions (key, model, content, size, created_at, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, model, content, len(content.encode("utf-8")), now, now)
+        )
+        self._evict(conn, now)
+
+    # Expire old entries, then drop least recently used ones until under max_bytes
+    def _evict(self, conn, now):
+        expired = conn.execute(
+            "DELETE FROM completions WHERE created_at < ?", (now - self.max_age,)
+        ).rowcount
+        if expired:
+            self._count(conn, "evictions", expired)
+        super()._evict(conn)
+
+
+# Process-wide cache instance
+get_llm_cache = process_instance(LLMCache)
+
+
+# Run a chat completion, reusing a cached answer for an identical request unless force is set.
+# Identical requests already in flight, in this or another process, share one API call.
+def cached_completion(client, model, messages, force=False, **params):
+    key = request_key(model, messages, **params)
+    if not force:
+        content = get_llm_cache().get(key)
+        if content is not None:
+            annotate(cache="hit")
+            return content
+    return get_single_flight().do(("completion", key), _complete, client, model, messages, key, force, params)
+
+
+def _complete(client, model, messages, key, force, params):
+    cache = get_llm_cache()
+    # Another process may have finished this request while we waited for its lock
+    if not force:
+        content = cache.get(key, count=False)
+        if content is not None:
+            annotate(cache="hit")
+            return content
+    annotate(cache="miss")
+    response = client.chat.completions.create(messages=messages, model=model, **params)
+    content = response.choices[0].message.content
+    if response.usage is not None:
+        annotate(prompt_tokens=response.usage.prompt_tokens,
+                 completion_tokens=response.usage.completion_tokens)
+    if content:
+        cache.put(key, model, content)
+    return content
+
+
+# Streaming variant: yields text chunks as they arrive and caches the full text once complete.
+# Concurrent identical requests read the same stream, replayed from the start for late joiners.
+def stream_completion(client, model, messages, force=False, **params):
+    key = request_key(model, messages, **params)
+    if not force:
+        content = get_llm_cache().get(key)
+        if content is not None:
+            annotate(cache="hit")
+            first_token()
+            yield content
+            return
+    yield from get_single_flight().stream(
+        ("completion", key), lambda: _stream_fresh(client, model, messages, key, force, params)
+    )
+
+
+def _stream_fresh(client, model, messages, key, force, params):
+    cache = get_llm_cache()
+    if not force:
+        content = cache.get(key, count=False)
+        if content is not None:
+            annotate(cache="hit")
+            yield content
+            return
+    annotate(cache="miss")
+    parts = []
+    stream = client.chat.completions.create(
+        messages=messages, model=model, stream=True, stream_options={"include_usage": True}, **params
+    )
+    for chunk in stream:
+        if chunk.usage is not None:
+            annotate(prompt_tokens=chunk.usage.prompt_tokens,
+                     completion_tokens=chunk.usage.completion_tokens)
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            first_token()
+            parts.append(delta)
+            yield delta
+    # Only complete answers are cached; a stream that failed part way never reaches this point
+    if parts:
+        cache.put(key, model, "".join(parts))
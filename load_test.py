@@ -0,0 +1,393 @@
+import argparse
+import atexit
+import inspect
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from benchmark import PLAYER_FIXTURES, _fixture_name, _git_revision
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app_ai.py")
+FAKE_SERVERS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_servers.py")
+
+# Name searches that resolve against the fake FBref search, plus a URL flow for every fixture
+SEARCH_NAMES = ["Haaland", "van Dijk"]
+
+CHAT_QUESTIONS = [
+    "How does he compare with the best players in his position?",
+    "What are his main weaknesses?",
+    "Would he suit a counter-attacking side?",
+    "Is he worth a transfer fee at his age?",
+    "Which role gets the most out of him?",
+]
+
+
+def _targets(fbref_root):
+    urls = []
+    for path in PLAYER_FIXTURES:
+        player_id, slug = _fixture_name(path).split("-", 1)
+        urls.append(f"{fbref_root}/en/players/{player_id}/{slug}")
+    return SEARCH_NAMES + urls
+
+
+def _percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+def _summary(samples):
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean_seconds": statistics.fmean(ordered),
+        "p50_seconds": _percentile(ordered, 0.50),
+        "p95_seconds": _percentile(ordered, 0.95),
+        "p99_seconds": _percentile(ordered, 0.99),
+        "max_seconds": ordered[-1],
+    }
+
+
+# Resident memory of this process in bytes: current on Linux, the peak elsewhere
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak * (1 if sys.platform == "darwin" else 1024)
+
+
+def _cpu_seconds():
+    times = os.times()
+    return times.user + times.system
+
+
+# Memory, CPU and load of the process every `interval` seconds until stop is set.
+# cpu_percent is over all cores, so it can go past 100.
+class Sampler(threading.Thread):
+    def __init__(self, interval, active):
+        super().__init__(name="load-test-sampler", daemon=True)
+        self.interval = interval
+        self.active = active
+        self.samples = []
+        self.stop = threading.Event()
+
+    def run(self):
+        start = time.monotonic()
+        last_wall, last_cpu = start, _cpu_seconds()
+        while True:
+            stopped = self.stop.wait(self.interval)
+            now, cpu = time.monotonic(), _cpu_seconds()
+            self.samples.append({
+                "elapsed_seconds": round(now - start, 3),
+                "rss_bytes": _rss_bytes(),
+                "cpu_percent": round(100 * (cpu - last_cpu) / max(now - last_wall, 1e-9), 1),
+                "active_sessions": self.active(),
+                "threads": threading.active_count(),
+            })
+            last_wall, last_cpu = now, cpu
+            if stopped:
+                return
+
+
+class StepFailed(Exception):
+    pass
+
+
+def _find(elements, label):
+    for element in elements:
+        if element.label == label:
+            return element
+    raise StepFailed(f"No widget labelled {label!r}")
+
+
+# Streamlit releases _share_app_test_state has been checked against: from, up to but not including
+TESTED_STREAMLIT = ("1.65", "1.66")
+
+
+# _share_app_test_state patches Streamlit internals that can change in any release,
+# so refuse to run on a version nobody has checked rather than measure something else
+def _check_streamlit_version(allow_untested):
+    import streamlit
+    from packaging.version import Version
+
+    version = Version(streamlit.__version__)
+    if allow_untested or Version(TESTED_STREAMLIT[0]) <= version < Version(TESTED_STREAMLIT[1]):
+        return
+    sys.exit(
+        f"load_test.py patches Streamlit internals and has been checked against Streamlit "
+        f">={TESTED_STREAMLIT[0]},<{TESTED_STREAMLIT[1]}, not {streamlit.__version__}. "
+        f"Check _share_app_test_state against this release, then update TESTED_STREAMLIT "
+        f"(or pass --allow-untested-streamlit)."
+    )
+
+
+# AppTest assumes one test at a time; make it behave like one server process with many sessions.
+# It compiles the script afresh on every run, where a server compiles it once (and concurrent
+# compiles crash CPython 3.11's parser), so share one compiled copy. It also installs a mock
+# runtime for each run and clears it afterwards, under other sessions' script threads, so keep
+# the most recent one available.
+def _share_app_test_state():
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+    # The patches below replace these exact shapes; anything else would be silently bypassed
+    if (list(inspect.signature(ScriptCache.get_bytecode).parameters) != ["self", "script_path"]
+            or not isinstance(inspect.getattr_static(Runtime, "instance"), classmethod)
+            or not hasattr(Runtime, "_instance")):
+        raise RuntimeError(
+            "Streamlit's ScriptCache.get_bytecode or Runtime.instance has changed; "
+            "update _share_app_test_state in load_test.py"
+        )
+
+    shared = ScriptCache()
+    get_bytecode = ScriptCache.get_bytecode
+    ScriptCache.get_bytecode = lambda self, script_path: get_bytecode(shared, script_path)
+
+    latest = []
+    instance = Runtime.instance.__func__
+
+    def runtime_instance(cls):
+        if cls._instance is not None:
+            latest[:] = [cls._instance]
+        elif latest:
+            return latest[0]
+        return instance(cls)
+
+    Runtime.instance = classmethod(runtime_instance)
+
+
+# Start fake_servers.py in a process of its own, so its threads and sockets are not part of the
+# memory and CPU measured here. Returns the settings it prints once it is listening.
+def _start_fake_servers(args):
+    process = subprocess.Popen(
+        [sys.executable, FAKE_SERVERS_PATH, "--fbref-port", "0", "--openai-port", "0",
+         "--fbref-latency", str(args.fbref_latency), "--latency", str(args.latency),
+         "--tokens", str(args.tokens), "--token-delay", str(args.token_delay)],
+        stdout=subprocess.PIPE, text=True
+    )
+    atexit.register(process.terminate)
+    env = {}
+    while len(env) < 2:
+        line = process.stdout.readline()
+        if not line:
+            sys.exit(f"fake_servers.py exited with status {process.wait()} before it was listening")
+        name, _, value = line.strip().partition("=")
+        env[name] = value
+    return env
+
+
+# One simulated analyst: a browser tab running the app script, as a Streamlit server does per session
+class Session:
+    def __init__(self, number, targets, record, think, timeout, chat_turns):
+        from streamlit.testing.v1 import AppTest
+
+        self.number = number
+        self.targets = targets
+        self.record = record
+        self.think = think
+        self.timeout = timeout
+        self.chat_turns = chat_turns
+        self.random = random.Random(number)
+        self.app = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.app.session_state["session_id"] = uuid.uuid4().hex
+
+    # Fill in a text box and/or click a button, run the script and record how long the user waited
+    def step(self, name, text=None, button=None):
+        start = time.perf_counter()
+        error = None
+        try:
+            if text is not None:
+                label, value = text
+                _find(self.app.text_input, label).input(value)
+            if button is not None:
+                (_find(self.app.button, button) if isinstance(button, str) else button).click()
+            start = time.perf_counter()
+            self.app.run(timeout=self.timeout)
+            if len(self.app.exception):
+                error = self.app.exception[0].message
+            elif len(self.app.error):
+                error = self.app.error[0].value
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        self.record(name, time.perf_counter() - start, error)
+        if error is not None:
+            raise StepFailed(error)
+        # Reading the result before the next click
+        if self.think:
+            time.sleep(self.think * self.random.uniform(0.5, 1.5))
+
+    def flow(self, target):
+        method = "FBRef URL" if target.startswith("http") else "Player Name"
+        if self.app.radio[0].value != method:
+            self.app.radio[0].set_value(method)
+            self.step("input_method")
+        if method == "FBRef URL":
+            self.step("url_report", ("Enter FBRef player URL", target), "Generate Report")
+        else:
+            self.step("search_report", ("Enter player full name (First and Last name)", target), "Search")
+            # Names the local index only partly matches wait for the analyst to pick one
+            matches = [box for box in self.app.selectbox if box.label == "Matching players"]
+            if matches:
+                # Pick the candidate with a fixture page, or fall back to a full FBref search
+                candidates = self.app.session_state["player_candidates"]
+                fixtures = {_fixture_name(path).split("-", 1)[0] for path in PLAYER_FIXTURES}
+                picks = [i for i, (_, url, _) in enumerate(candidates) if url.split("/")[-2] in fixtures]
+                matches[0].set_value(picks[0] if picks else len(candidates))
+                self.step("pick_match_report")
+
+        # Suggested questions are offered until the conversation gets going
+        suggested = [button for button in self.app.button if (button.key or "").startswith("q_")]
+        if suggested:
+            self.step("suggested_question", button=self.random.choice(suggested))
+        for _ in range(self.chat_turns):
+            self.step("chat_turn", ("Question", self.random.choice(CHAT_QUESTIONS)), "Send")
+
+    def run(self, flows):
+        completed = 0
+        try:
+            self.step("load")
+        except StepFailed:
+            return completed
+        for i in range(flows):
+            try:
+                self.flow(self.targets[(self.number + i) % len(self.targets)])
+                completed += 1
+            except StepFailed:
+                pass
+        return completed
+
+
+# Drive `sessions` concurrent sessions through `flows` player lookups each and summarize the run
+def run_load(targets, sessions, flows, ramp, think, timeout, chat_turns, sample_interval):
+    lock = threading.Lock()
+    latencies = {}
+    errors = {}
+    active = [0]
+
+    def record(name, seconds, error):
+        with lock:
+            if error is None:
+                latencies.setdefault(name, []).append(seconds)
+            else:
+                errors.setdefault(name, []).append(error)
+
+    def simulate(number):
+        # Spread session starts over the ramp so they don't all arrive in the same instant
+        time.sleep(ramp * number / max(sessions, 1))
+        with lock:
+            active[0] += 1
+        try:
+            return Session(number, targets, record, think, timeout, chat_turns).run(flows)
+        finally:
+            with lock:
+                active[0] -= 1
+
+    sampler = Sampler(sample_interval, lambda: active[0])
+    sampler.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions, thread_name_prefix="session") as executor:
+        completed = sum(executor.map(simulate, range(sessions)))
+    elapsed = time.perf_counter() - start
+    sampler.stop.set()
+    sampler.join()
+
+    steps = {}
+    for name in sorted(set(latencies) | set(errors)):
+        summary = _summary(latencies[name]) if name in latencies else {"count": 0}
+        summary["errors"] = len(errors.get(name, []))
+        if name in errors:
+            summary["first_error"] = errors[name][0]
+        steps[name] = summary
+    total_steps = sum(len(v) for v in latencies.values())
+    return {
+        "elapsed_seconds": elapsed,
+        "flows_completed": completed,
+        "flows_per_sec": completed / elapsed,
+        "steps_per_sec": total_steps / elapsed,
+        "errors": sum(len(v) for v in errors.values()),
+        "steps": steps,
+        "peak_rss_bytes": max((s["rss_bytes"] for s in sampler.samples), default=None),
+        "mean_cpu_percent": statistics.fmean(s["cpu_percent"] for s in sampler.samples) if sampler.samples else None,
+    }, sampler.samples
+
+
+# Usage: python load_test.py --sessions 20 --flows 3 --out load.json
+# Runs app_ai.py for every simulated session in this process through Streamlit's AppTest, the
+# way one server process runs a script thread per browser tab, against the fake FBref and OpenAI
+# servers (in a separate process). Samples this process's memory and CPU over the run and prints
+# JSON results.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for the scouting app.")
+    parser.add_argument("--sessions", type=int, default=10, help="simulated analysts running at once")
+    parser.add_argument("--flows", type=int, default=2, help="player lookups per session")
+    parser.add_argument("--chat-turns", type=int, default=3, help="typed chat questions after each report")
+    parser.add_argument("--ramp-seconds", type=float, default=10, help="time over which sessions start")
+    parser.add_argument("--think-seconds", type=float, default=1.0, help="mean pause between a session's steps")
+    parser.add_argument("--step-timeout", type=float, default=120, help="seconds before a step counts as failed")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="seconds between memory/CPU samples")
+    parser.add_argument("--latency", type=float, default=0.5, help="fake OpenAI seconds before the first token")
+    parser.add_argument("--tokens", type=int, default=400, help="fake OpenAI completion tokens")
+    parser.add_argument("--token-delay", type=float, default=0.005, help="fake OpenAI seconds between tokens")
+    parser.add_argument("--fbref-latency", type=float, default=0.1, help="seconds added to every FBref response")
+    parser.add_argument("--no-report-cache", action="store_true",
+                        help="generate every report instead of serving repeats from the LLM cache")
+    parser.add_argument("--allow-untested-streamlit", action="store_true",
+                        help="run even on a Streamlit release the AppTest patches were not checked against")
+    parser.add_argument("--out", help="write results to this JSON file as well as stdout")
+    args = parser.parse_args()
+
+    _check_streamlit_version(args.allow_untested_streamlit)
+    fakes = _start_fake_servers(args)
+    fbref_root = fakes["SCOUT_FBREF_ROOT"]
+    # Settings are read at import time, so point everything at the fakes before the app is loaded
+    os.environ.update({
+        "SCOUT_FBREF_ROOT": fbref_root,
+        "OPENAI_BASE_URL": fakes["OPENAI_BASE_URL"],
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "load-test"),
+        "SCOUT_CACHE_DIR": tempfile.mkdtemp(prefix="scout-load-"),
+    })
+    if args.no_report_cache:
+        os.environ["SCOUT_LLM_CACHE_MAX_AGE"] = "0"
+
+    import tracing
+    from http_client import get_http_client
+
+    _share_app_test_state()
+    # The fake FBref has no crawl limit
+    get_http_client().bucket.configure(rate=1e6, capacity=1e6)
+
+    results, samples = run_load(
+        _targets(fbref_root), args.sessions, args.flows, args.ramp_seconds, args.think_seconds,
+        args.step_timeout, args.chat_turns, args.sample_interval
+    )
+    output = {
+        "meta": {
+            "revision": _git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "config": vars(args),
+        },
+        "results": results,
+        "samples": samples,
+        "spans": tracing.registry.span_summary(),
+    }
+    text = json.dumps(output, indent=2, ensure_ascii=False)
+    print(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    sys.exit(1 if results["errors"] else 0)
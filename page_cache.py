@@ -0,0 +1,125 @@
+import os
+import time
+import zlib
+
+import requests
+
+from http_client import get_http_client
+from settings import CACHE_DIR, PAGE_CACHE_TTL, PAGE_CACHE_MAX_BYTES
+from single_flight import get_single_flight
+from sqlite_cache import LRUCache, process_instance
+from tracing import annotate, span
+
+
+# On-disk cache of FBref pages keyed by URL.
+# SQLite gives us one file that every session and worker process can share safely.
+class PageCache(LRUCache):
+    table = "pages"
+    key = "url"
+    counters = ("hits", "misses", "revalidated", "stale", "evictions")
+    lookups = ("hits", "misses", "revalidated", "stale")
+
+    def __init__(self, path=None, ttl=None, max_bytes=None):
+        super().__init__(
+            path or os.path.join(CACHE_DIR, "pages.sqlite3"),
+            """
+                url TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            """,
+            max_bytes if max_bytes is not None else PAGE_CACHE_MAX_BYTES
+        )
+        self.ttl = dict(PAGE_CACHE_TTL, **(ttl or {}))
+
+    # Cached page body for url if it is fresh enough, else None.
+    # max_age (seconds) overrides the freshness limit for this kind of page.
+    def get_fresh(self, url, kind="player", max_age=None):
+        conn = self.connect()
+        now = time.time()
+        row = conn.execute("SELECT body, fetched_at FROM pages WHERE url = ?", (url,)).fetchone()
+        if max_age is None:
+            max_age = self.ttl.get(kind, 0)
+        if row and now - row[1] < max_age:
+            conn.execute("UPDATE pages SET last_access = ? WHERE url = ?", (now, url))
+            self._count(conn, "hits")
+            annotate(cache="hit")
+            return zlib.decompress(row[0]).decode("utf-8")
+        return None
+
+    # Return the page body for url, downloading or revalidating it only when needed
+    def get(self, url, kind="player", max_age=None):
+        html = self.get_fresh(url, kind, max_age)
+        if html is not None:
+            return html
+        conn = self.connect()
+        now = time.time()
+        row = conn.execute(
+            "SELECT body, etag, last_modified FROM pages WHERE url = ?", (url,)
+        ).fetchone()
+
+        # Stale or missing: ask FBref, conditionally if we have validators
+        headers = {}
+        if row and row[1]:
+            headers["If-None-Match"] = row[1]
+        if row and row[2]:
+            headers["If-Modified-Since"] = row[2]
+
+        try:
+            response = get_http_client().get(url, headers=headers)
+        except requests.RequestException:
+            if row:
+                # Serve the stale copy rather than failing the report
+                self._count(conn, "stale")
+                annotate(cache="stale")
+                return zlib.decompress(row[0]).decode("utf-8")
+            raise
+
+        if response.status_code == 304 and row:
+            conn.execute(
+                "UPDATE pages SET fetched_at = ?, last_access = ? WHERE url = ?", (now, now, url)
+            )
+            self._count(conn, "revalidated")
+            annotate(cache="revalidated")
+            return zlib.decompress(row[0]).decode("utf-8")
+
+        if response.status_code != 200:
+            if row:
+                self._count(conn, "stale")
+                annotate(cache="stale")
+                return zlib.decompress(row[0]).decode("utf-8")
+            response.raise_for_status()
+            return response.text
+
+        self._count(conn, "misses")
+        annotate(cache="miss")
+        body = zlib.compress(response.text.encode("utf-8"))
+        conn.execute(
+            "INSERT OR REPLACE INTO pages "
+            "(url, kind, body, size, etag, last_modified, fetched_at, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (url, kind, body, len(body), response.headers.get("ETag"),
+             response.headers.get("Last-Modified"), now, now)
+        )
+        self._evict(conn)
+        return response.text
+
+
+# Process-wide cache instance
+get_page_cache = process_instance(PageCache)
+
+
+# Fetch an FBref page through the shared cache, timed as a fetch_<kind> span.
+# Concurrent requests for the same URL share one download; cache hits never enter the flight.
+def fetch_page(url, kind="player", max_age=None):
+    with span(f"fetch_{kind}") as attrs:
+        cache = get_page_cache()
+        html = cache.get_fresh(url, kind, max_age)
+        if html is None:
+            html = get_single_flight().do(("page", url), cache.get, url, kind, max_age)
+        attrs["bytes"] = len(html)
+        return html
@@ -0,0 +1,121 @@
+import io
+import os
+import time
+from functools import lru_cache
+
+import requests
+from PIL import Image, ImageDraw
+
+from http_client import RateLimited, get_http_client
+from settings import CACHE_DIR, PHOTO_CACHE_MAX_BYTES, PHOTO_CACHE_TTL, PHOTO_MISSING_TTL, PHOTO_WIDTH
+from single_flight import get_single_flight
+from sqlite_cache import LRUCache, process_instance
+from tracing import annotate, span
+
+
+# Downscale a downloaded headshot to the display width as a compact JPEG
+def make_thumbnail(data, width=PHOTO_WIDTH):
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert("RGB")
+        image.thumbnail((width, width * 2), Image.LANCZOS)
+        out = io.BytesIO()
+        image.save(out, format="JPEG", quality=85, optimize=True, progressive=True)
+        return out.getvalue()
+
+
+# Grey silhouette shown when a player has no photo or it could not be downloaded
+@lru_cache(maxsize=1)
+def placeholder_photo(width=PHOTO_WIDTH):
+    height = width * 4 // 3
+    image = Image.new("RGB", (width, height), (224, 226, 230))
+    draw = ImageDraw.Draw(image)
+    head = width * 0.22
+    cx, cy = width / 2, height * 0.38
+    draw.ellipse((cx - head, cy - head, cx + head, cy + head), fill=(176, 180, 188))
+    draw.ellipse((cx - width * 0.42, height * 0.66, cx + width * 0.42, height * 1.2), fill=(176, 180, 188))
+    out = io.BytesIO()
+    image.save(out, format="PNG", optimize=True)
+    return out.getvalue()
+
+
+# On-disk cache of player headshot thumbnails keyed by photo URL, shared by every process.
+# Failed downloads are remembered (as empty rows) for a shorter time so they are not retried on every view.
+class PhotoCache(LRUCache):
+    table = "photos"
+    key = "url"
+    counters = ("hits", "misses", "failures", "evictions")
+
+    def __init__(self, path=None, ttl=None, missing_ttl=None, max_bytes=None):
+        super().__init__(
+            path or os.path.join(CACHE_DIR, "photos.sqlite3"),
+            """
+                url TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            """,
+            max_bytes if max_bytes is not None else PHOTO_CACHE_MAX_BYTES
+        )
+        self.ttl = ttl if ttl is not None else PHOTO_CACHE_TTL
+        self.missing_ttl = missing_ttl if missing_ttl is not None else PHOTO_MISSING_TTL
+
+    # (found, thumbnail bytes or None) from the cache alone; found is False when a download is due
+    def get_fresh(self, url):
+        conn = self.connect()
+        now = time.time()
+        row = conn.execute("SELECT body, fetched_at FROM photos WHERE url = ?", (url,)).fetchone()
+        if row and now - row[1] < (self.ttl if row[0] else self.missing_ttl):
+            conn.execute("UPDATE photos SET last_access = ? WHERE url = ?", (now, url))
+            self._count(conn, "hits")
+            annotate(cache="hit")
+            return True, row[0] or None
+        return False, None
+
+    # Thumbnail bytes for url, downloading and downscaling on a miss; None if there is no usable photo
+    def get(self, url):
+        found, body = self.get_fresh(url)
+        if found:
+            return body
+        conn = self.connect()
+        now = time.time()
+        row = conn.execute("SELECT body FROM photos WHERE url = ?", (url,)).fetchone()
+
+        self._count(conn, "misses")
+        annotate(cache="miss")
+        try:
+            response = get_http_client().get(url)
+            response.raise_for_status()
+            body = make_thumbnail(response.content)
+        except RateLimited:
+            # Not a missing photo, just not now; try again on the next view
+            return row[0] if row and row[0] else None
+        except (requests.RequestException, OSError):
+            # Keep serving an older thumbnail if there is one; otherwise remember the failure
+            if row and row[0]:
+                return row[0]
+            body = b""
+            self._count(conn, "failures")
+        annotate(bytes=len(body))
+        conn.execute(
+            "INSERT OR REPLACE INTO photos (url, body, size, fetched_at, last_access) VALUES (?, ?, ?, ?, ?)",
+            (url, body, len(body), now, now)
+        )
+        self._evict(conn)
+        return body or None
+
+
+# Process-wide cache instance
+get_photo_cache = process_instance(PhotoCache)
+
+
+# Headshot thumbnail for photo_url through the shared cache, or None when there is none
+def fetch_photo(photo_url):
+    if not photo_url:
+        return None
+    with span("fetch_photo"):
+        cache = get_photo_cache()
+        found, body = cache.get_fresh(photo_url)
+        if found:
+            return body
+        return get_single_flight().do(("photo", photo_url), cache.get, photo_url)
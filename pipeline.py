@@ -0,0 +1,224 @@
+import asyncio
+import queue
+import re
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import scout
+from fbref_parser import absolute_url, parse_player_page
+from page_cache import fetch_page
+
+HEADSHOT_IMG_RE = re.compile(r'<img[^>]*class="[^"]*headshot[^"]*"[^>]*>', re.IGNORECASE)
+SRC_RE = re.compile(r'\ssrc="([^"]+)"')
+
+_DONE = object()
+
+
+# Cheap regex scan for the headshot URL so the photo download can start before the full parse
+def find_photo_url(html):
+    img = HEADSHOT_IMG_RE.search(html)
+    src = SRC_RE.search(img.group(0)) if img else None
+    return absolute_url(src.group(1)) if src else None
+
+
+# One player lookup in flight: stage results arrive as they finish
+class Lookup:
+    def __init__(self, query):
+        self.query = query
+        self.started = time.perf_counter()
+        # Seconds from the start of the lookup until each stage finished
+        self.timings = {}
+        self.url = None
+        self.page = None
+        self.photo = None
+        self.report = None
+        self.error = None
+        # Resolves with the parsed page as soon as it is available
+        self.page_future = Future()
+        # Resolves when every stage, including photo and report, has finished
+        self.done = None
+        self._chunks = queue.Queue()
+
+    def mark(self, stage):
+        self.timings[stage] = time.perf_counter() - self.started
+
+    # Yield report chunks as the model produces them (blocking the caller between chunks)
+    def report_chunks(self):
+        while True:
+            chunk = self._chunks.get()
+            if chunk is _DONE:
+                return
+            if isinstance(chunk, BaseException):
+                raise chunk
+            yield chunk
+
+
+# asyncio pipeline on a background event loop shared by every session in the process.
+# Short blocking steps (HTTP, parsing) run in a thread pool; report streams, which last as long
+# as the model takes, get a thread each so they never hold up other sessions' lookups. Identical
+# in-flight page and photo fetches are already shared by the caches' single-flight.
+class Pipeline:
+    def __init__(self, workers=16):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pipeline")
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, name="pipeline-loop", daemon=True).start()
+
+    async def _run(self, fn, *args):
+        return await self.loop.run_in_executor(self._executor, fn, *args)
+
+    async def _photo(self, lookup, photo_url):
+        try:
+            lookup.photo = await self._run(scout.get_player_photo, photo_url)
+        except Exception:
+            lookup.photo = None
+        lookup.mark("photo")
+
+    def _pump_report(self, lookup, page, force):
+        try:
+            chunks = scout.stream_scouting_report(
+                page.name, page.position, page.age, page.team, page.stats_df, force=force
+            )
+            parts = []
+            for chunk in chunks:
+                if not parts:
+                    lookup.mark("report_first_token")
+                parts.append(chunk)
+                lookup._chunks.put(chunk)
+            lookup.report = "".join(parts)
+            lookup.mark("report")
+        except Exception as e:
+            lookup._chunks.put(e)
+        finally:
+            lookup._chunks.put(_DONE)
+
+    # Relay the report stream from its own thread; the returned future resolves when it ends
+    def _start_report(self, lookup, page, force):
+        done = self.loop.create_future()
+
+        def pump():
+            try:
+                self._pump_report(lookup, page, force)
+            finally:
+                self.loop.call_soon_threadsafe(done.set_result, None)
+
+        threading.Thread(target=pump, name="pipeline-report", daemon=True).start()
+        return done
+
+    async def _guarded(self, lookup, with_report, force):
+        try:
+            return await self._lookup(lookup, with_report, force)
+        except Exception as e:
+            lookup.error = e
+            if not lookup.page_future.done():
+                lookup.page_future.set_exception(e)
+                # Nothing was streamed yet; unblock anyone waiting on the report
+                lookup._chunks.put(e)
+                lookup._chunks.put(_DONE)
+            raise
+
+    async def _lookup(self, lookup, with_report, force):
+        query = lookup.query
+        if query.startswith("http") or "/en/players/" in query:
+            url = query
+        else:
+            url = await self._run(scout.search_player, query)
+            lookup.mark("search")
+            if not url:
+                raise LookupError(f"Player not found: {query}")
+        lookup.url = url
+
+        html = await self._run(fetch_page, url, "player")
+        lookup.mark("fetch")
+
+        # Start the headshot download while the page is still being parsed
+        photo_task = None
+        photo_url = find_photo_url(html)
+        if photo_url:
+            photo_task = asyncio.ensure_future(self._photo(lookup, photo_url))
+
+        lookup.page = await self._run(parse_player_page, html)
+        lookup.mark("parse")
+        lookup.page_future.set_result(lookup.page)
+
+        # Report generation starts as soon as the stats table is available
+        report_task = None
+        if with_report:
+            report_task = self._start_report(lookup, lookup.page, force)
+        else:
+            lookup._chunks.put(_DONE)
+        if photo_task is None and lookup.page.photo_url:
+            photo_task = asyncio.ensure_future(self._photo(lookup, lookup.page.photo_url))
+
+        # Recording the player in the name index and stats corpus is off the critical path
+        remember_task = self._run(scout.remember_player, url, lookup.page)
+
+        await asyncio.gather(*[task for task in (photo_task, report_task, remember_task) if task is not None])
+        return lookup
+
+    # Start looking up a player (FBref URL or name) and return its Lookup right away
+    def start(self, query, with_report=True, force=False):
+        lookup = Lookup(query)
+        lookup.done = asyncio.run_coroutine_threadsafe(self._guarded(lookup, with_report, force), self.loop)
+        return lookup
+
+    # Fetch several players at once; results are in input order, failures carry .error
+    def lookup_many(self, queries, with_report=False):
+        lookups = [self.start(query, with_report=with_report) for query in queries]
+        for lookup in lookups:
+            try:
+                lookup.done.result()
+            except Exception:
+                pass
+        return lookups
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+# Process-wide pipeline instance
+def get_pipeline():
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = Pipeline()
+    return _pipeline
+
+
+# The original one-step-after-another path, timed the same way for comparison
+def serial_lookup(query, force=False):
+    lookup = Lookup(query)
+    url = query
+    if not (query.startswith("http") or "/en/players/" in query):
+        url = scout.search_player(query)
+        lookup.mark("search")
+    html = fetch_page(url, "player")
+    lookup.mark("fetch")
+    lookup.page = parse_player_page(html)
+    lookup.mark("parse")
+    if lookup.page.photo_url:
+        lookup.photo = scout.get_player_photo(lookup.page.photo_url)
+        lookup.mark("photo")
+    lookup.report = "".join(scout.stream_scouting_report(
+        lookup.page.name, lookup.page.position, lookup.page.age, lookup.page.team, lookup.page.stats_df,
+        force=force
+    ))
+    lookup.mark("report")
+    return lookup
+
+
+# Usage: python pipeline.py [--force] "Player Name" https://fbref.com/en/players/... [...]
+# Prints per-stage timings for the serial path and the pipeline. For a fair comparison run with
+# SCOUT_SEARCH_TTL=0 SCOUT_PLAYER_TTL=0 and --force so neither path is served from the caches.
+if __name__ == "__main__":
+    force = "--force" in sys.argv
+    for query in [arg for arg in sys.argv[1:] if arg != "--force"]:
+        serial = serial_lookup(query, force=force)
+        lookup = get_pipeline().start(query, force=force)
+        lookup.done.result()
+        for label, timings in (("serial", serial.timings), ("pipeline", lookup.timings)):
+            stages = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items())
+            print(f"{query} [{label}]: {stages}")
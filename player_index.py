@@ -0,0 +1,211 @@
+import bisect
+import json
+import os
+import re
+import sys
+import threading
+import unicodedata
+from collections import Counter
+
+from settings import CACHE_DIR
+
+# Very short queries match thousands of names; only rank the first few hundred
+MAX_PREFIX_SCAN = 500
+
+
+# Lowercase, strip accents and punctuation: "Vinícius Júnior" -> "vinicius junior"
+def normalize_name(name):
+    text = unicodedata.normalize("NFKD", name)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text.lower()).split())
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# Local name -> FBref URL index, learned from every search result and player page we see.
+# Entries are appended to a JSONL log so all worker processes share and extend the same index.
+class PlayerIndex:
+    def __init__(self, path=None):
+        self.path = path or os.path.join(CACHE_DIR, "player_index.jsonl")
+        self._lock = threading.Lock()
+        self._offset = 0
+        self.names = {}       # url -> display name
+        self._keys = []       # sorted (normalized key, url) for prefix search, rebuilt lazily
+        self._keys_dirty = False
+        self._grams = {}      # trigram -> set of urls
+        self._gram_counts = {}  # url -> number of trigrams in its name
+        self._normalized = {}  # url -> normalized full name
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._refresh()
+
+    def _index(self, name, url):
+        old = self._normalized.get(url)
+        normalized = normalize_name(name)
+        if old == normalized:
+            self.names[url] = name
+            return
+        if old is not None:
+            self._unindex(url, old)
+        self.names[url] = name
+        self._normalized[url] = normalized
+        self._keys_dirty = True
+        grams = trigrams(normalized)
+        self._gram_counts[url] = len(grams)
+        for gram in grams:
+            self._grams.setdefault(gram, set()).add(url)
+
+    def _unindex(self, url, normalized):
+        for gram in trigrams(normalized):
+            self._grams.get(gram, set()).discard(url)
+
+    # Every word start is a prefix entry, so "junior" finds "Vinicius Junior"
+    def _sorted_keys(self):
+        if self._keys_dirty:
+            keys = []
+            for url, normalized in self._normalized.items():
+                words = normalized.split()
+                keys.extend((" ".join(words[i:]), url) for i in range(len(words)))
+            keys.sort()
+            self._keys = keys
+            self._keys_dirty = False
+        return self._keys
+
+    # Pick up entries other processes appended since we last looked
+    def _refresh(self):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        if size <= self._offset:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        # Only consume complete lines; a writer may be mid-append
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            try:
+                entry = json.loads(line)
+                self._index(entry["name"], entry["url"])
+            except (ValueError, KeyError):
+                continue
+        self._offset += end
+
+    def add_many(self, entries):
+        with self._lock:
+            self._refresh()
+            new = [(name, url) for name, url in entries
+                   if name and url and self.names.get(url) != name]
+            if not new:
+                return 0
+            lines = "".join(json.dumps({"name": name, "url": url}, ensure_ascii=False) + "\n"
+                            for name, url in new)
+            # One O_APPEND write keeps lines from different processes from interleaving
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, lines.encode("utf-8"))
+            finally:
+                os.close(fd)
+            self._refresh()
+            return len(new)
+
+    def add(self, name, url):
+        return self.add_many([(name, url)])
+
+    # Ranked (name, url, score) candidates: exact, then word-prefix, then trigram fuzzy matches
+    def lookup(self, query, limit=5):
+        normalized = normalize_name(query)
+        if not normalized:
+            return []
+        with self._lock:
+            self._refresh()
+            scores = {}
+
+            keys = self._sorted_keys()
+            pos = bisect.bisect_left(keys, (normalized, ""))
+            end = min(len(keys), pos + MAX_PREFIX_SCAN)
+            while pos < end and keys[pos][0].startswith(normalized):
+                key, url = keys[pos]
+                full = self._normalized[url]
+                if full == normalized:
+                    score = 1.0
+                elif key == full:
+                    score = 0.9
+                else:
+                    score = 0.8
+                scores[url] = max(scores.get(url, 0.0), score)
+                pos += 1
+
+            # Fuzzy matching only when nothing matches as typed (misspellings, missing letters)
+            if not scores:
+                query_grams = trigrams(normalized)
+                overlap = Counter()
+                for gram in query_grams:
+                    overlap.update(self._grams.get(gram, ()))
+                for url, shared in overlap.items():
+                    # Dice coefficient over trigrams, kept below any prefix match
+                    dice = 2 * shared / (len(query_grams) + self._gram_counts[url])
+                    if dice >= 0.4:
+                        scores[url] = 0.7 * dice
+
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], len(self.names[item[0]])))
+            return [(self.names[url], url, score) for url, score in ranked[:limit]]
+
+    # URL for query when the index is confident enough to skip the FBref search
+    def resolve(self, query):
+        candidates = self.lookup(query, limit=2)
+        if not candidates:
+            return None
+        best = candidates[0]
+        if best[2] == 1.0 and (len(candidates) == 1 or candidates[1][2] < 1.0):
+            return best[1]
+        return None
+
+    def __len__(self):
+        return len(self.names)
+
+
+_player_index = None
+_player_index_lock = threading.Lock()
+
+
+# Process-wide index instance
+def get_player_index():
+    global _player_index
+    if _player_index is None:
+        with _player_index_lock:
+            if _player_index is None:
+                _player_index = PlayerIndex()
+    return _player_index
+
+
+# Read "name<TAB>url" or "name,url" lines for bulk seeding
+def read_seed_file(path):
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            sep = "\t" if "\t" in line else ","
+            name, _, url = line.rpartition(sep)
+            if name and url.startswith("http"):
+                entries.append((name.strip(), url.strip()))
+    return entries
+
+
+# Usage: python player_index.py seed players.tsv
+#        python player_index.py lookup "Vini Jr"
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "seed":
+        added = get_player_index().add_many(read_seed_file(sys.argv[2]))
+        print(f"Added {added} players ({len(get_player_index())} in the index)")
+    elif len(sys.argv) == 3 and sys.argv[1] == "lookup":
+        for name, url, score in get_player_index().lookup(sys.argv[2]):
+            print(f"{score:.2f}  {name}  {url}")
+    else:
+        print("Usage: python player_index.py seed FILE | lookup NAME", file=sys.stderr)
+        sys.exit(2)
@@ -0,0 +1,111 @@
+import math
+import sys
+
+from chat_context import count_tokens
+
+# Static instructions come first in every prompt and never change between players,
+# so the provider's prompt prefix cache can reuse them; player data always goes last.
+REPORT_SYSTEM_PROMPT = """You are a professional football (soccer) scout.
+
+When asked for a scouting report, return it in the following markdown format:
+
+## <player name> Scouting Report
+
+### Strengths
+< a list of 1 to 3 strengths >
+
+### Weaknesses
+< a list of 1 to 3 weaknesses >
+
+### Summary
+< a brief summary of the player's overall performance and if he would be beneficial to the team >"""
+
+CHAT_SYSTEM_PROMPT = """You are a professional football (soccer) scout with deep knowledge about players, tactics, and football analytics. Answer questions about the player based on the provided statistics and scouting report. Be concise but insightful. Respond in a conversational tone. Here is the player information:"""
+
+
+# Shortest exact text for a table cell: 12.0 -> "12", NaN -> "-"
+def format_value(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "-"
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() else str(float(value))
+    return str(value).strip()
+
+
+# Scout summary as a header line plus one "Statistic: Per 90 | Percentile" line per row.
+# Same values as to_markdown(), without the padding, pipes and index column.
+def encode_stats(stats_df):
+    columns = [col[-1] if isinstance(col, tuple) else col for col in stats_df.columns]
+    stat_index = columns.index("Statistic")
+    value_columns = [str(col) for i, col in enumerate(columns) if i != stat_index]
+    lines = [f"Statistic: {' | '.join(value_columns)}"]
+    for row in stats_df.itertuples(index=False, name=None):
+        values = [format_value(value) for i, value in enumerate(row) if i != stat_index]
+        lines.append(f"{row[stat_index]}: {' | '.join(values)}")
+    return "\n".join(lines)
+
+
+# Variable part of every prompt: who the player is and their numbers
+def player_block(player_name, position, age, team, stats_df):
+    return (
+        f"Player: {player_name}\n"
+        f"Position: {position}\n"
+        f"Age: {age}\n"
+        f"Team: {team}\n"
+        f"\n"
+        f"Statistics:\n"
+        f"{encode_stats(stats_df)}"
+    )
+
+
+# Function to build the scouting report request
+def report_messages(player_name, position, age, team, stats_df):
+    return [
+        {
+            "role": "system",
+            "content": REPORT_SYSTEM_PROMPT,
+        },
+        {
+            "role": "user",
+            "content": f"Create a scouting report on {player_name}, with their strengths and weaknesses.\n\n"
+                       f"{player_block(player_name, position, age, team, stats_df)}",
+        }
+    ]
+
+
+# Function to build the chat system message for a player and their report
+def chat_system_message(player_name, position, age, team, stats_df, report):
+    return {
+        "role": "system",
+        "content": f"{CHAT_SYSTEM_PROMPT}\n\n"
+                   f"{player_block(player_name, position, age, team, stats_df)}\n\n"
+                   f"Scouting Report:\n{report}",
+    }
+
+
+# Prompt tokens for the old markdown table layout versus the compact encoding
+def prompt_token_report(pages):
+    rows = []
+    for label, page in pages:
+        markdown = count_tokens(page.stats_df.to_markdown())
+        compact = count_tokens(encode_stats(page.stats_df))
+        rows.append({
+            "player": label,
+            "markdown_tokens": markdown,
+            "compact_tokens": compact,
+            "saved": 1 - compact / markdown if markdown else 0.0,
+        })
+    return rows
+
+
+# Usage: python prompts.py saved_player_page.html [...]
+if __name__ == "__main__":
+    from fbref_parser import parse_player_page
+
+    pages = []
+    for path in sys.argv[1:]:
+        with open(path, encoding="utf-8") as f:
+            pages.append((path, parse_player_page(f.read())))
+    for row in prompt_token_report(pages):
+        print(f"{row['player']}: {row['markdown_tokens']} -> {row['compact_tokens']} tokens "
+              f"({row['saved']:.0%} fewer)")
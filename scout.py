@@ -0,0 +1,143 @@
+import os
+from functools import lru_cache
+from urllib.parse import quote_plus
+
+from openai import OpenAI
+
+from fbref_parser import parse_player_page, parse_search_results
+from llm_cache import cached_completion, request_key, stream_completion
+from page_cache import fetch_page
+from photo_cache import fetch_photo
+from player_index import get_player_index
+from prompts import report_messages
+from settings import FBREF_ROOT
+from stats_store import get_stats_store
+from tracing import annotate, first_token, span
+
+REPORT_MODEL = "gpt-4.1-mini"
+
+
+# Shared OpenAI client; OPENAI_BASE_URL is honoured so a local fake server can stand in
+@lru_cache(maxsize=1)
+def get_openai_client():
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if not api_key:
+        raise RuntimeError("Missing OpenAI API key. Please set the OPENAI_API_KEY environment variable.")
+    return OpenAI(api_key=api_key)
+
+
+# Function to find a player's FBref URL from their name
+# The local index answers unambiguous names; FBref is only searched on a miss
+def search_player(player_name, use_index=True):
+    index = get_player_index()
+    with span("search"):
+        if use_index:
+            url = index.resolve(player_name)
+            if url:
+                annotate(cache="hit")
+                return url
+        annotate(cache="miss")
+        search_url = f"{FBREF_ROOT}/search/search.fcgi?search={quote_plus(player_name)}"
+        results = parse_search_results(fetch_page(search_url, kind="search"))
+        index.add_many(results)
+        return results[0][1] if results else None
+
+
+# Function to scrape and parse a player page, remembering the player in the name index
+# max_age (seconds) asks for a page at most that old instead of the cache's usual freshness
+def get_player_page(url, max_age=None):
+    # Get the webpage content (served from the shared page cache when fresh)
+    html = fetch_page(url, kind="player", max_age=max_age)
+    page = parse_player_page(html)
+    remember_player(url, page)
+    return page
+
+
+# Function to add a parsed player to the local name index and the stats store
+def remember_player(url, page):
+    if page.name:
+        get_player_index().add(page.name, url)
+    get_stats_store().upsert([(url, page)])
+
+
+# Function to scrape player data
+def get_player_data(url):
+    page = get_player_page(url)
+    return page.name, page.position, page.age, page.team, page.photo_url, page.stats_df
+
+
+# Function to get a player's headshot as a small local thumbnail (None if there is no photo)
+def get_player_photo(photo_url):
+    return fetch_photo(photo_url)
+
+
+# Sampling parameters for reports and for the chat agent
+REPORT_PARAMS = {"temperature": 1, "max_tokens": 4096, "top_p": 1}
+CHAT_PARAMS = {"temperature": 0.7, "max_tokens": 2048, "top_p": 1}
+
+
+# Function to generate scouting report
+# Identical requests are answered from the LLM cache unless force is set
+def generate_scouting_report(player_name, position, age, team, stats_df, force=False):
+    messages = report_messages(player_name, position, age, team, stats_df)
+    with span("report"):
+        return cached_completion(get_openai_client(), REPORT_MODEL, messages, force=force, **REPORT_PARAMS)
+
+
+# Function to get the LLM cache key a scouting report request for this player would use
+def report_key(player_name, position, age, team, stats_df):
+    messages = report_messages(player_name, position, age, team, stats_df)
+    return request_key(REPORT_MODEL, messages, **REPORT_PARAMS)
+
+
+# Function to stream the scouting report chunk by chunk
+def stream_scouting_report(player_name, position, age, team, stats_df, force=False):
+    messages = report_messages(player_name, position, age, team, stats_df)
+    with span("report"):
+        yield from stream_completion(get_openai_client(), REPORT_MODEL, messages, force=force, **REPORT_PARAMS)
+
+
+# Function to stream a chat answer for a full message history
+# Token usage reported at the end of the stream is copied into `usage` when given
+def stream_chat(messages, usage=None):
+    with span("chat"):
+        stream = get_openai_client().chat.completions.create(
+            messages=messages, model=REPORT_MODEL, stream=True,
+            stream_options={"include_usage": True}, **CHAT_PARAMS
+        )
+        for chunk in stream:
+            if chunk.usage is not None:
+                annotate(prompt_tokens=chunk.usage.prompt_tokens,
+                         completion_tokens=chunk.usage.completion_tokens)
+                if usage is not None:
+                    usage.update(prompt_tokens=chunk.usage.prompt_tokens,
+                                 completion_tokens=chunk.usage.completion_tokens)
+            if chunk.choices and chunk.choices[0].delta.content:
+                first_token()
+                yield chunk.choices[0].delta.content
+
+
+# Function to fold older chat turns into a short running summary
+def summarize_chat(summary, turns):
+    transcript = "\n".join(f"{turn['role']}: {turn['content']}" for turn in turns)
+    with span("chat_summary") as attrs:
+        response = get_openai_client().chat.completions.create(
+            messages=[
+                {
+                    "role": "system",
+                    "content": "Condense this scouting conversation into a brief summary that keeps every fact, "
+                               "opinion and open question about the player. Reply with the summary only.",
+                },
+                {
+                    "role": "user",
+                    "content": f"Summary so far:\n{summary or '(none)'}\n\nNew turns:\n{transcript}",
+                }
+            ],
+            model=REPORT_MODEL,
+            temperature=0.2,
+            max_tokens=400
+        )
+        if response.usage is not None:
+            attrs.update(prompt_tokens=response.usage.prompt_tokens,
+                         completion_tokens=response.usage.completion_tokens)
+    return response.choices[0].message.content
@@ -0,0 +1,199 @@
+import argparse
+import json
+import os
+import queue
+import re
+import sys
+import threading
+
+import scout
+from http_client import get_http_client
+from settings import FBREF_BURST, FBREF_RATE
+
+
+# Read one player per line: FBref URLs or plain names, '#' starts a comment
+def read_inputs(path):
+    if path == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    lines = [line.split("#", 1)[0].strip() for line in lines]
+    inputs = []
+    for line in lines:
+        if line and line not in inputs:
+            inputs.append(line)
+    return inputs
+
+
+def is_player_url(value):
+    return value.startswith("http") or "/en/players/" in value
+
+
+def slugify(value):
+    return re.sub(r"[^A-Za-z0-9]+", "_", value).strip("_") or "player"
+
+
+# Inputs that already have a finished report in the output file
+def completed_inputs(results_path):
+    done = set()
+    if not os.path.exists(results_path):
+        return done
+    with open(results_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A crash can leave a truncated last line; that player gets redone
+                continue
+            if record.get("report") and not record.get("error"):
+                done.add(record["input"])
+    return done
+
+
+# Stage 1: resolve names, fetch and parse player pages (and headshots, when they will be exported)
+def fetch_worker(inputs, parsed, results, photos=False):
+    while True:
+        value = inputs.get()
+        if value is None:
+            return
+        record = {"input": value}
+        try:
+            url = value if is_player_url(value) else scout.search_player(value)
+            if not url:
+                raise LookupError("Player not found")
+            record["url"] = url
+            name, position, age, team, photo_url, stats_df = scout.get_player_data(url)
+            record.update(name=name, position=position, age=age, team=team, photo_url=photo_url)
+            if photos:
+                # Warms the photo cache so writing the result needs no download
+                scout.get_player_photo(photo_url)
+            parsed.put((record, stats_df))
+        except Exception as e:
+            record["error"] = f"fetch: {e}"
+            results.put(record)
+
+
+# Stage 2: generate the report; the pool size caps concurrent OpenAI calls
+def report_worker(parsed, results, force):
+    while True:
+        item = parsed.get()
+        if item is None:
+            return
+        record, stats_df = item
+        try:
+            record["report"] = scout.generate_scouting_report(
+                record["name"], record["position"], record["age"], record["team"], stats_df,
+                force=force
+            )
+        except Exception as e:
+            record["error"] = f"report: {e}"
+        results.put(record)
+
+
+# Append one finished record; flushed and synced so a crash loses at most the player in flight
+def write_result(record, out_dir, fmt, results_file):
+    if fmt == "markdown" and record.get("report"):
+        slug = slugify(record.get('name') or record['input'])
+        report = record["report"]
+        photo = scout.get_player_photo(record.get("photo_url"))
+        if photo:
+            with open(os.path.join(out_dir, f"{slug}.jpg"), "wb") as f:
+                f.write(photo)
+            report = f"![{record['name']}]({slug}.jpg)\n\n{report}"
+        path = os.path.join(out_dir, f"{slug}.md")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(report)
+        record["path"] = path
+    results_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+    results_file.flush()
+    os.fsync(results_file.fileno())
+
+
+def run(args):
+    os.makedirs(args.out, exist_ok=True)
+    results_path = os.path.join(args.out, "reports.jsonl")
+
+    inputs = read_inputs(args.input)
+    done = completed_inputs(results_path) if args.resume else set()
+    todo = [value for value in inputs if value not in done]
+    print(f"{len(inputs)} players, {len(inputs) - len(todo)} already done, {len(todo)} to run",
+          file=sys.stderr)
+    if not todo:
+        return 0
+
+    # Politeness limit shared by every fetch worker (cache hits do not count); a batch run
+    # waits its turn however long the queue is
+    client = get_http_client()
+    client.bucket.configure(rate=args.fbref_rate, capacity=args.fbref_burst)
+    client.max_wait = None
+
+    # Bounded queues keep fetching from running far ahead of report generation
+    input_queue = queue.Queue()
+    parsed_queue = queue.Queue(maxsize=args.llm_workers * 2)
+    result_queue = queue.Queue()
+    for value in todo:
+        input_queue.put(value)
+
+    fetchers = [
+        threading.Thread(
+            target=fetch_worker, args=(input_queue, parsed_queue, result_queue, args.format == "markdown"),
+            daemon=True
+        )
+        for _ in range(args.fetch_workers)
+    ]
+    reporters = [
+        threading.Thread(target=report_worker, args=(parsed_queue, result_queue, args.force), daemon=True)
+        for _ in range(args.llm_workers)
+    ]
+    for thread in fetchers + reporters:
+        thread.start()
+    for _ in fetchers:
+        input_queue.put(None)
+
+    # Close stage 2 once every fetcher has drained
+    def close_reporters():
+        for thread in fetchers:
+            thread.join()
+        for _ in reporters:
+            parsed_queue.put(None)
+
+    threading.Thread(target=close_reporters, daemon=True).start()
+
+    failures = 0
+    mode = "a" if args.resume else "w"
+    with open(results_path, mode, encoding="utf-8") as results_file:
+        for finished in range(1, len(todo) + 1):
+            record = result_queue.get()
+            write_result(record, args.out, args.format, results_file)
+            if record.get("error"):
+                failures += 1
+                print(f"[{finished}/{len(todo)}] {record['input']}: {record['error']}", file=sys.stderr)
+            else:
+                print(f"[{finished}/{len(todo)}] {record['name']}", file=sys.stderr)
+
+    return 1 if failures else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate scouting reports for a list of players.")
+    parser.add_argument("input", help="file with one FBref URL or player name per line ('-' for stdin)")
+    parser.add_argument("-o", "--out", default="reports", help="output directory (default: reports)")
+    parser.add_argument("-f", "--format", choices=["jsonl", "markdown"], default="jsonl",
+                        help="also write one markdown file per player with 'markdown'")
+    parser.add_argument("--fetch-workers", type=int, default=4, help="concurrent FBref fetch/parse workers")
+    parser.add_argument("--llm-workers", type=int, default=4, help="concurrent OpenAI report requests")
+    parser.add_argument("--fbref-rate", type=float, default=FBREF_RATE,
+                        help="max FBref requests per second across all workers")
+    parser.add_argument("--fbref-burst", type=int, default=FBREF_BURST,
+                        help="FBref requests allowed back to back before the rate applies")
+    parser.add_argument("--no-resume", dest="resume", action="store_false",
+                        help="start over instead of skipping players already in reports.jsonl")
+    parser.add_argument("--force", action="store_true",
+                        help="regenerate reports even when an identical one is cached")
+    args = parser.parse_args(argv)
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
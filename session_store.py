@@ -0,0 +1,203 @@
+import json
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from chat_context import ChatContext
+from fbref_parser import parse_player_page
+from page_cache import fetch_page
+from photo_cache import fetch_photo
+from settings import CACHE_DIR, SESSION_IDLE_SECONDS, SESSION_MEMORY_BUDGET, SESSION_RETENTION
+from sqlite_cache import SQLiteFile, process_instance
+
+
+# One session's work on one player: the report and conversation (saved to disk) plus the parsed
+# page and headshot, which are reloaded from the shared caches whenever they are needed again
+class PlayerSession:
+    def __init__(self, url, name, position, age, team, photo_url, report="", chat=None, page=None, photo=None,
+                 report_interrupted=False):
+        self.url = url
+        self.name = name
+        self.position = position
+        self.age = age
+        self.team = team
+        self.photo_url = photo_url
+        self.report = report
+        # The report's stream was cut short; it is finished again rather than reused
+        self.report_interrupted = report_interrupted
+        self.chat = chat
+        self._page = page
+        self._photo = photo
+
+    @classmethod
+    def from_page(cls, url, page):
+        return cls(url, page.name, page.position, page.age, page.team, page.photo_url, page=page)
+
+    @property
+    def page(self):
+        if self._page is None:
+            self._page = parse_player_page(fetch_page(url=self.url, kind="player"))
+        return self._page
+
+    @property
+    def stats_df(self):
+        return self.page.stats_df
+
+    @property
+    def tables(self):
+        return self.page.tables
+
+    @property
+    def photo(self):
+        if self._photo is None and self.photo_url:
+            self._photo = fetch_photo(self.photo_url)
+        return self._photo
+
+    @photo.setter
+    def photo(self, value):
+        self._photo = value
+
+    # Approximate memory held, in bytes
+    def size(self):
+        total = len(self.report or "") + len(self._photo or b"")
+        if self.chat is not None:
+            total += self.chat.size()
+        if self._page is not None:
+            total += self._page.tables.size() + int(self._page.stats_df.memory_usage(deep=True).sum())
+        return total
+
+    def to_state(self):
+        return {
+            "name": self.name, "position": self.position, "age": self.age, "team": self.team,
+            "photo_url": self.photo_url, "report": self.report, "report_interrupted": self.report_interrupted,
+            "chat": self.chat.to_state() if self.chat is not None else None,
+        }
+
+    @classmethod
+    def from_state(cls, url, state, summarize):
+        chat = ChatContext.from_state(state["chat"], summarize) if state.get("chat") else None
+        return cls(url, state["name"], state["position"], state["age"], state["team"], state["photo_url"],
+                   report=state["report"], chat=chat, report_interrupted=state.get("report_interrupted", False))
+
+
+# Reports and conversations for every session, keyed by (session id, player URL).
+# Everything is written through to a compressed SQLite store, so it survives restarts. In memory
+# only each session's active player is kept, and those are dropped again when the session goes
+# idle or the total passes the memory budget; they reload from disk on the next access.
+class SessionStore(SQLiteFile):
+    def __init__(self, summarize, path=None, memory_budget=None, idle_seconds=None, retention=None):
+        super().__init__(path or os.path.join(CACHE_DIR, "sessions.sqlite3"))
+        self.summarize = summarize
+        self.memory_budget = memory_budget if memory_budget is not None else SESSION_MEMORY_BUDGET
+        self.idle_seconds = idle_seconds if idle_seconds is not None else SESSION_IDLE_SECONDS
+        self.retention = retention if retention is not None else SESSION_RETENTION
+        self._lock = threading.Lock()
+        self._active = OrderedDict()  # session id -> (PlayerSession, last used, size), least recent first
+        self._total = 0               # sum of the sizes in _active
+        self.evictions = 0
+        with self.connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS player_sessions (
+                    session_id TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    name TEXT,
+                    state BLOB NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (session_id, url)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS player_sessions_updated ON player_sessions (updated_at)")
+            conn.execute("DELETE FROM player_sessions WHERE updated_at < ?", (time.time() - self.retention,))
+
+    def _load(self, session_id, url):
+        row = self.connect().execute(
+            "SELECT state FROM player_sessions WHERE session_id = ? AND url = ?", (session_id, url)
+        ).fetchone()
+        if row is None:
+            return None
+        state = json.loads(zlib.decompress(row[0]))
+        return PlayerSession.from_state(url, state, self.summarize)
+
+    # Make player the session's active one, dropping its previous player from memory.
+    # A player's size is measured when it becomes active and re-measured when it is saved.
+    def _activate(self, session_id, player, changed):
+        with self._lock:
+            current = self._active.get(session_id)
+        if changed or current is None or current[0] is not player:
+            size = player.size()
+        else:
+            size = current[2]
+        now = time.monotonic()
+        with self._lock:
+            previous = self._active.pop(session_id, None)
+            if previous is not None:
+                self._total -= previous[2]
+            self._active[session_id] = (player, now, size)
+            self._total += size
+            # Idle sessions first, then the least recently used, never the one just touched.
+            # _active is in order of last use, so idle sessions are all at the front.
+            for other, (_, last_used, other_size) in list(self._active.items()):
+                if other == session_id or now - last_used <= self.idle_seconds:
+                    break
+                del self._active[other]
+                self._total -= other_size
+                self.evictions += 1
+            for other in list(self._active):
+                if self._total <= self.memory_budget or other == session_id:
+                    break
+                self._total -= self._active.pop(other)[2]
+                self.evictions += 1
+
+    # The session's player for url from memory or disk, or None if the session never opened it
+    def get(self, session_id, url):
+        if not session_id or not url:
+            return None
+        with self._lock:
+            active = self._active.get(session_id)
+        if active is not None and active[0].url == url:
+            player = active[0]
+        else:
+            player = self._load(session_id, url)
+            if player is None:
+                return None
+        self._activate(session_id, player, changed=False)
+        return player
+
+    # Persist player and make it the session's active one
+    def save(self, session_id, player):
+        state = zlib.compress(json.dumps(player.to_state(), ensure_ascii=False).encode("utf-8"))
+        self.connect().execute(
+            "INSERT OR REPLACE INTO player_sessions (session_id, url, name, state, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (session_id, player.url, player.name, state, time.time())
+        )
+        self._activate(session_id, player, changed=True)
+
+    # (url, name) of the players a session has opened, most recent first
+    def players(self, session_id):
+        return self.connect().execute(
+            "SELECT url, name FROM player_sessions WHERE session_id = ? ORDER BY updated_at DESC",
+            (session_id,)
+        ).fetchall()
+
+    def stats(self):
+        with self._lock:
+            active = len(self._active)
+            memory = self._total
+        entries, size = self.connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(state)), 0) FROM player_sessions"
+        ).fetchone()
+        return {
+            "active_sessions": active,
+            "memory_bytes": memory,
+            "memory_budget": self.memory_budget,
+            "evictions": self.evictions,
+            "saved_players": entries,
+            "saved_bytes": size,
+        }
+
+
+# Process-wide store instance: get_session_store(summarize)
+get_session_store = process_instance(SessionStore)
@@ -0,0 +1,67 @@
+import os
+
+# Directory for on-disk caches shared by every Streamlit session and worker process
+CACHE_DIR = os.environ.get(
+    "SCOUT_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+)
+
+# FBref page cache: freshness per kind of page (seconds) and total size cap (bytes)
+PAGE_CACHE_TTL = {
+    "search": int(os.environ.get("SCOUT_SEARCH_TTL", 6 * 3600)),
+    "player": int(os.environ.get("SCOUT_PLAYER_TTL", 24 * 3600)),
+}
+PAGE_CACHE_MAX_BYTES = int(os.environ.get("SCOUT_PAGE_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# FBref site root; point at a local stub server for offline runs
+FBREF_ROOT = os.environ.get("SCOUT_FBREF_ROOT", "https://fbref.com").rstrip("/")
+
+# Shared HTTP client for FBref: timeouts (seconds), retries and process-wide rate limit.
+# FBref asks bots to stay under roughly 10 requests per minute. HTTP_MAX_WAIT is the longest an
+# interactive request queues for the rate limit before giving up (seconds).
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("SCOUT_HTTP_CONNECT_TIMEOUT", 5))
+HTTP_READ_TIMEOUT = float(os.environ.get("SCOUT_HTTP_READ_TIMEOUT", 20))
+HTTP_MAX_RETRIES = int(os.environ.get("SCOUT_HTTP_MAX_RETRIES", 3))
+HTTP_BACKOFF_BASE = float(os.environ.get("SCOUT_HTTP_BACKOFF_BASE", 1.0))
+HTTP_MAX_RETRY_AFTER = float(os.environ.get("SCOUT_HTTP_MAX_RETRY_AFTER", 60))
+HTTP_POOL_SIZE = int(os.environ.get("SCOUT_HTTP_POOL_SIZE", 16))
+FBREF_RATE = float(os.environ.get("SCOUT_FBREF_RATE", 10 / 60))
+FBREF_BURST = int(os.environ.get("SCOUT_FBREF_BURST", 5))
+HTTP_MAX_WAIT = float(os.environ.get("SCOUT_HTTP_MAX_WAIT", 30))
+
+# LLM response cache: total size cap (bytes) and maximum entry age (seconds)
+LLM_CACHE_MAX_BYTES = int(os.environ.get("SCOUT_LLM_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+LLM_CACHE_MAX_AGE = int(os.environ.get("SCOUT_LLM_CACHE_MAX_AGE", 7 * 24 * 3600))
+
+# Chat context: prompt token budget per request, how many recent messages are always kept verbatim,
+# and the fraction of the budget a conversation is folded down to once it goes over
+CHAT_TOKEN_BUDGET = int(os.environ.get("SCOUT_CHAT_TOKEN_BUDGET", 8000))
+CHAT_KEEP_RECENT = int(os.environ.get("SCOUT_CHAT_KEEP_RECENT", 4))
+CHAT_FOLD_TARGET = float(os.environ.get("SCOUT_CHAT_FOLD_TARGET", 0.7))
+
+# Metrics export: Prometheus text endpoint port and/or textfile path (disabled when unset)
+METRICS_PORT = int(os.environ.get("SCOUT_METRICS_PORT", 0))
+METRICS_FILE = os.environ.get("SCOUT_METRICS_FILE", "")
+METRICS_FILE_INTERVAL = float(os.environ.get("SCOUT_METRICS_FILE_INTERVAL", 15))
+
+# Single-flight coalescing: how long callers wait on someone else's identical in-flight work
+# (seconds), and whether to also coordinate worker processes through lock files in CACHE_DIR
+SINGLE_FLIGHT_TIMEOUT = float(os.environ.get("SCOUT_SINGLE_FLIGHT_TIMEOUT", 180))
+SINGLE_FLIGHT_CROSS_PROCESS = bool(int(os.environ.get("SCOUT_SINGLE_FLIGHT_CROSS_PROCESS", 1)))
+
+# Headshot cache: stored thumbnail width (pixels, the size the app displays), how long photos
+# and failed downloads are kept (seconds), and total size cap (bytes)
+PHOTO_WIDTH = int(os.environ.get("SCOUT_PHOTO_WIDTH", 120))
+PHOTO_CACHE_TTL = int(os.environ.get("SCOUT_PHOTO_TTL", 30 * 24 * 3600))
+PHOTO_MISSING_TTL = int(os.environ.get("SCOUT_PHOTO_MISSING_TTL", 24 * 3600))
+PHOTO_CACHE_MAX_BYTES = int(os.environ.get("SCOUT_PHOTO_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+
+# Per-session working sets: memory budget for every session's active player (bytes), idle time
+# before a session's player is dropped from memory (seconds), and how long saved reports and
+# conversations are kept on disk (seconds)
+SESSION_MEMORY_BUDGET = int(os.environ.get("SCOUT_SESSION_MEMORY_BUDGET", 256 * 1024 * 1024))
+SESSION_IDLE_SECONDS = int(os.environ.get("SCOUT_SESSION_IDLE_SECONDS", 30 * 60))
+SESSION_RETENTION = int(os.environ.get("SCOUT_SESSION_RETENTION", 30 * 24 * 3600))
+
+# Columnar stats store: small files a scrape-date partition may collect before they are merged
+STATS_STORE_MAX_FILES = int(os.environ.get("SCOUT_STATS_STORE_MAX_FILES", 32))
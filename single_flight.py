@@ -0,0 +1,201 @@
+import contextvars
+import hashlib
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import CancelledError
+from contextlib import contextmanager
+
+from settings import CACHE_DIR, SINGLE_FLIGHT_CROSS_PROCESS, SINGLE_FLIGHT_TIMEOUT
+from tracing import annotate, first_token
+
+try:
+    import fcntl
+except ImportError:  # Windows: coalesce within the process only
+    fcntl = None
+
+# How often blocked callers re-check their deadline and cancel flag (seconds)
+POLL_INTERVAL = 0.1
+
+# Keys share a fixed set of lock files per kind of work (the first item of the key: "page",
+# "photo", "completion"), so the lock directory never grows and a page fetch never queues behind
+# a model response. Two keys of one kind landing in the same slot only take turns across
+# processes; work run under a lock must not start another flight.
+LOCK_SLOTS = 1024
+
+
+def _deadline(timeout):
+    return None if timeout is None else time.monotonic() + timeout
+
+
+# Raise if the caller gave up, or if the deadline passed
+def _check(deadline, cancel, what):
+    if cancel is not None and cancel.is_set():
+        raise CancelledError(f"Cancelled while waiting for {what}")
+    if deadline is not None and time.monotonic() >= deadline:
+        raise TimeoutError(f"Timed out waiting for {what}")
+
+
+def _wait(event, deadline, cancel, what):
+    while not event.wait(POLL_INTERVAL):
+        _check(deadline, cancel, what)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+# One streamed result shared by every reader: chunks are kept so late joiners replay from the start
+class _Stream:
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.chunks = []
+        self.finished = False
+        self.error = None
+
+    def read(self, key, timeout, cancel):
+        position = 0
+        deadline = _deadline(timeout)
+        while True:
+            with self.cond:
+                while position == len(self.chunks) and not self.finished:
+                    self.cond.wait(POLL_INTERVAL)
+                    _check(deadline, cancel, key)
+                chunks = self.chunks[position:]
+                finished = self.finished
+            position += len(chunks)
+            for chunk in chunks:
+                first_token()
+                yield chunk
+            if chunks:
+                # The timeout bounds silence between chunks, not the length of the whole stream
+                deadline = _deadline(timeout)
+            if finished and position == len(self.chunks):
+                if self.error is not None:
+                    raise self.error
+                return
+
+
+# Process-wide request coalescing: the first caller for a key does the work and every caller that
+# arrives while it is in flight shares the same result or error. With a lock directory, leaders in
+# different processes also take turns on a file lock for the key's slot, so a follower process runs
+# after the first has filled the shared caches and its own call is answered from them.
+class SingleFlight:
+    def __init__(self, lock_dir=None):
+        self.lock_dir = lock_dir
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._streams = {}
+        self.counts = Counter()
+        if lock_dir:
+            os.makedirs(lock_dir, exist_ok=True)
+
+    def _lock_path(self, key):
+        kind = key[0] if isinstance(key, tuple) and key and isinstance(key[0], str) else "key"
+        slot = int.from_bytes(hashlib.sha256(repr(key).encode("utf-8")).digest()[:8], "big") % LOCK_SLOTS
+        return os.path.join(self.lock_dir, f"{kind}-{slot:04d}.lock")
+
+    @contextmanager
+    def _file_lock(self, key, deadline, cancel):
+        if not self.lock_dir or fcntl is None:
+            yield
+            return
+        fd = os.open(self._lock_path(key), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    _check(deadline, cancel, key)
+                    time.sleep(POLL_INTERVAL)
+            yield
+        finally:
+            # Closing the descriptor releases the lock
+            os.close(fd)
+
+    # Run fn(*args) once for every concurrent caller with the same key
+    def do(self, key, fn, *args, timeout=SINGLE_FLIGHT_TIMEOUT, cancel=None):
+        deadline = _deadline(timeout)
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self.counts["leader" if leader else "shared"] += 1
+
+        if not leader:
+            annotate(cache="shared")
+            _wait(call.done, deadline, cancel, key)
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            with self._file_lock(key, deadline, cancel):
+                call.result = fn(*args)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    # Iterate chunks of factory() shared by every concurrent caller with the same key.
+    # The stream is produced on its own thread, so it completes (and lands in the caches)
+    # even if the caller that started it stops reading.
+    def stream(self, key, factory, timeout=SINGLE_FLIGHT_TIMEOUT, cancel=None):
+        with self._lock:
+            shared = self._streams.get(key)
+            leader = shared is None
+            if leader:
+                shared = self._streams[key] = _Stream()
+            self.counts["leader" if leader else "shared"] += 1
+
+        if leader:
+            # Run in a copy of the caller's context so its tracing span still sees cache and token usage
+            context = contextvars.copy_context()
+            threading.Thread(
+                target=context.run, args=(self._produce, key, shared, factory, timeout),
+                name="single-flight", daemon=True
+            ).start()
+        else:
+            annotate(cache="shared")
+        return shared.read(key, timeout, cancel)
+
+    def _produce(self, key, shared, factory, timeout):
+        try:
+            with self._file_lock(key, _deadline(timeout), None):
+                for chunk in factory():
+                    with shared.cond:
+                        shared.chunks.append(chunk)
+                        shared.cond.notify_all()
+        except BaseException as e:
+            shared.error = e
+        finally:
+            with self._lock:
+                self._streams.pop(key, None)
+            with shared.cond:
+                shared.finished = True
+                shared.cond.notify_all()
+
+
+_single_flight = None
+_single_flight_lock = threading.Lock()
+
+
+# Process-wide instance, coordinating with other processes unless SCOUT_SINGLE_FLIGHT_CROSS_PROCESS=0
+def get_single_flight():
+    global _single_flight
+    if _single_flight is None:
+        with _single_flight_lock:
+            if _single_flight is None:
+                lock_dir = os.path.join(CACHE_DIR, "locks") if SINGLE_FLIGHT_CROSS_PROCESS else None
+                _single_flight = SingleFlight(lock_dir)
+    return _single_flight
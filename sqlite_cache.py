@@ -0,0 +1,103 @@
+import os
+import sqlite3
+import threading
+
+
+# A SQLite file shared by every session and worker process, with one WAL connection per thread
+class SQLiteFile:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+    # One connection per thread; Streamlit runs each session in its own thread
+    def connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+
+# Size-bounded cache table with least recently used eviction and hit/miss counters.
+# Subclasses name the table and its key column; `columns` must include size and last_access.
+# `lookups` are the counters that each answer one lookup, misses among them.
+class LRUCache(SQLiteFile):
+    table = None
+    key = None
+    counters = ("hits", "misses", "evictions")
+    lookups = ("hits", "misses")
+
+    def __init__(self, path, columns, max_bytes):
+        super().__init__(path)
+        self.max_bytes = max_bytes
+        with self.connect() as conn:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {self.table} ({columns})")
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.table}_last_access ON {self.table} (last_access)"
+            )
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS counters (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            """)
+
+    def _count(self, conn, name, n=1):
+        conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, n)
+        )
+
+    # Drop least recently used entries until the cache fits under max_bytes
+    def _evict(self, conn):
+        total = conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in conn.execute(
+            f"SELECT {self.key}, size FROM {self.table} ORDER BY last_access ASC"
+        ).fetchall():
+            conn.execute(f"DELETE FROM {self.table} WHERE {self.key} = ?", (key,))
+            evicted += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+        self._count(conn, "evictions", evicted)
+
+    # Counters plus current cache size
+    def stats(self):
+        conn = self.connect()
+        stats = dict.fromkeys(self.counters, 0)
+        stats.update(dict(conn.execute("SELECT name, value FROM counters").fetchall()))
+        entries, size = conn.execute(
+            f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}"
+        ).fetchone()
+        stats["entries"] = entries
+        stats["bytes"] = size
+        lookups = sum(stats[name] for name in self.lookups)
+        stats["hit_rate"] = (lookups - stats["misses"]) / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        conn = self.connect()
+        conn.execute(f"DELETE FROM {self.table}")
+        conn.execute("DELETE FROM counters")
+
+
+# Getter for a process-wide instance, created by factory(*args) on first use
+def process_instance(factory):
+    instance = None
+    lock = threading.Lock()
+
+    def get(*args):
+        nonlocal instance
+        if instance is None:
+            with lock:
+                if instance is None:
+                    instance = factory(*args)
+        return instance
+    return get
@@ -0,0 +1,130 @@
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from stats_store import PER90_COLUMN, PERCENTILE_COLUMN, get_stats_store
+
+# Share of the target player's statistics a candidate must also have to be compared at all
+# (outfield players and goalkeepers have disjoint scout summaries)
+MIN_SHARED_STATS = 0.5
+
+SIMILAR_COLUMNS = ["name", "position", "age", "team", "similarity", "url"]
+
+
+# players x statistics float32 matrix over one of the matrix table's list columns, without copying
+def _matrix_view(table, column, width):
+    if table.num_rows == 0:
+        return np.full((0, width), np.nan, dtype=np.float32)
+    values = table.column(column).chunk(0).flatten().to_numpy()
+    return values.reshape(table.num_rows, -1)[:, :width]
+
+
+# Every scout summary in the stats store, as players x statistics matrices aligned on Statistic.
+# The numbers are views into the store's memory-mapped matrix.arrow, so every worker process
+# shares one page-cache copy; a newer matrix is picked up on the next query.
+class StatsCorpus:
+    def __init__(self, store=None):
+        self.store = store or get_stats_store()
+        self._lock = threading.Lock()
+        self._table = None
+        self._views = None
+
+    # (matrix table, statistic names, per 90 matrix, percentile matrix, ages) as of now
+    def _snapshot(self):
+        table = self.store.matrix()
+        with self._lock:
+            if table is not self._table:
+                stats = json.loads(table.schema.metadata[b"statistics"])
+                ages = table.column("age").to_numpy() if table.num_rows else np.full(0, np.nan, np.float32)
+                self._views = (stats, _matrix_view(table, "per90", len(stats)),
+                               _matrix_view(table, "pct", len(stats)), ages)
+                self._table = table
+            return (table, *self._views)
+
+    @property
+    def players(self):
+        players = self._snapshot()[0].select(["url", "name", "position", "age", "team"]).to_pylist()
+        for player in players:
+            player["age"] = None if np.isnan(player["age"]) else int(player["age"])
+        return players
+
+    def __len__(self):
+        return self._snapshot()[0].num_rows
+
+    def __contains__(self, url):
+        return pc.any(pc.equal(self._snapshot()[0].column("url"), url)).as_py() or False
+
+    # Side-by-side table for several players: one row per statistic, per 90 and percentile columns
+    def compare(self, urls):
+        table, stats, per90, pct, _ = self._snapshot()
+        rows = pc.index_in(pa.array(urls, pa.string()), value_set=table.column("url").combine_chunks())
+        rows = [row for row in rows.to_pylist() if row is not None]
+        names = table.column("name").take(rows).to_pylist()
+        per90 = per90[rows].T
+        pct = pct[rows].T
+        frames = {
+            (name, PER90_COLUMN): per90[:, i] for i, name in enumerate(names)
+        }
+        frames.update({(name, PERCENTILE_COLUMN): pct[:, i] for i, name in enumerate(names)})
+        table = pd.DataFrame(frames, index=pd.Index(stats, name="Statistic"))
+        order = [(name, kind) for name in names for kind in (PER90_COLUMN, PERCENTILE_COLUMN)]
+        table = table.reindex(columns=order)
+        return table.dropna(how="all")
+
+    # Nearest players to url by cosine similarity of percentile profiles, optionally filtered
+    def similar(self, url, k=10, position=None, min_age=None, max_age=None):
+        table, _, _, matrix, ages = self._snapshot()
+        found = pc.index(table.column("url"), url).as_py() if table.num_rows else -1
+        if found < 0:
+            return pd.DataFrame(columns=SIMILAR_COLUMNS)
+        target = found
+
+        # Compare only on statistics the target player has; missing values count as the median (50)
+        columns = ~np.isnan(matrix[target])
+        shared = np.count_nonzero(~np.isnan(matrix[:, columns]), axis=1)
+        data = np.nan_to_num(matrix[:, columns], nan=50.0) - 50.0
+        norms = np.linalg.norm(data, axis=1)
+        norms[norms == 0] = 1.0
+        scores = (data @ data[target]) / (norms * norms[target])
+
+        # Players with too few statistics in common would score as neutral (0.0) and outrank
+        # every genuinely dissimilar player, so they are not candidates
+        mask = shared >= max(1, MIN_SHARED_STATS * shared[target])
+        mask[target] = False
+        if position:
+            matches = pc.fill_null(pc.match_substring(table.column("position"), position), False)
+            mask &= matches.to_numpy()
+        # Players with an unknown age never pass an age filter (NaN compares False)
+        if min_age is not None:
+            mask &= ages >= min_age
+        if max_age is not None:
+            mask &= ages <= max_age
+        candidates = np.flatnonzero(mask)
+        if len(candidates) == 0:
+            return pd.DataFrame(columns=SIMILAR_COLUMNS)
+
+        top = min(k, len(candidates))
+        best = candidates[np.argpartition(-scores[candidates], top - 1)[:top]]
+        best = best[np.argsort(-scores[best])]
+        result = table.select(["name", "position", "age", "team", "url"]).take(best).to_pandas()
+        result["age"] = result["age"].astype("Int64")
+        result["similarity"] = scores[best].astype(float)
+        return result[SIMILAR_COLUMNS]
+
+
+_stats_corpus = None
+_stats_corpus_lock = threading.Lock()
+
+
+# Process-wide corpus instance
+def get_stats_corpus():
+    global _stats_corpus
+    if _stats_corpus is None:
+        with _stats_corpus_lock:
+            if _stats_corpus is None:
+                _stats_corpus = StatsCorpus()
+    return _stats_corpus
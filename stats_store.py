@@ -0,0 +1,413 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from settings import CACHE_DIR, STATS_STORE_MAX_FILES
+from sqlite_cache import SQLiteFile
+
+try:
+    import fcntl
+except ImportError:  # Windows: compaction is not coordinated across processes
+    fcntl = None
+
+PLAYER_SCHEMA = pa.schema([
+    ("url", pa.string()),
+    ("name", pa.string()),
+    ("position", pa.string()),
+    ("birthday", pa.string()),
+    ("age", pa.int32()),
+    ("team", pa.string()),
+    ("photo_url", pa.string()),
+    ("stats_hash", pa.string()),
+    ("checked_at", pa.float64()),
+])
+
+# A new metadata row is written only when one of these differs from the player's latest row
+TRACKED_FIELDS = ("name", "position", "birthday", "age", "team", "photo_url", "stats_hash")
+
+STATS_SCHEMA = pa.schema([
+    ("url", pa.string()),
+    ("stats_hash", pa.string()),
+    ("statistic", pa.string()),
+    ("per90", pa.float64()),
+    ("percentile", pa.float64()),
+])
+
+
+PER90_COLUMN = "Per 90"
+PERCENTILE_COLUMN = "Percentile"
+
+
+# Numeric (statistic -> (per 90, percentile)) pairs from a scout summary table
+def stats_to_values(stats_df):
+    columns = [col[-1] if isinstance(col, tuple) else col for col in stats_df.columns]
+    df = stats_df.copy()
+    df.columns = columns
+    values = {}
+    per90 = pd.to_numeric(df[PER90_COLUMN].astype(str).str.rstrip("%"), errors="coerce")
+    pct = pd.to_numeric(df[PERCENTILE_COLUMN], errors="coerce")
+    for stat, p, q in zip(df["Statistic"], per90, pct):
+        if isinstance(stat, str) and stat not in values:
+            values[stat] = [None if pd.isna(p) else float(p), None if pd.isna(q) else float(q)]
+    return values
+
+
+# Stable hash of a scout summary, so unchanged stats are never written twice
+def stats_hash(values):
+    digest = hashlib.sha256()
+    for stat in sorted(values):
+        per90, pct = values[stat]
+        digest.update(f"{stat}\x1f{per90}\x1f{pct}\x1e".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+# Persistent columnar store of scraped players: Arrow IPC files partitioned by scrape date.
+#   <root>/players/scrape_date=YYYY-MM-DD/<id>.arrow  metadata + stats hash, only when they changed
+#   <root>/stats/scrape_date=YYYY-MM-DD/<id>.arrow    long-form scout summary rows, only when they changed
+#   <root>/matrix.arrow                               every player's latest stats, one row per player
+#   <root>/checks.sqlite3                             when each player was last scraped
+# Files are uncompressed and read through memory maps, so processes reading the store share one
+# page-cache copy. A partition is merged into one file once it collects max_files small ones.
+# The comparison tab (StatsCorpus) queries matrix.arrow, which is rebuilt when the data changes.
+class StatsStore:
+    def __init__(self, root=None, max_files=None):
+        self.root = root or os.path.join(CACHE_DIR, "stats_store")
+        self.max_files = max_files if max_files is not None else STATS_STORE_MAX_FILES
+        self._lock = threading.Lock()
+        self._loaded = {"players": {}, "stats": {}}   # kind -> {path: mmapped table}
+        self._latest = None
+        self._known = {}  # url -> tracked fields of its latest metadata row
+        self._matrix = None
+        os.makedirs(self.root, exist_ok=True)
+        self._checks = SQLiteFile(os.path.join(self.root, "checks.sqlite3"))
+        with self._checks.connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS checks (
+                    url TEXT PRIMARY KEY,
+                    checked_at REAL NOT NULL
+                )
+            """)
+
+    def _files(self, kind):
+        return sorted(glob.glob(os.path.join(self.root, kind, "scrape_date=*", "*.arrow")))
+
+    # Memory-map files written since the last call (by this or another process)
+    # and forget files another process compacted away
+    def _table(self, kind, schema):
+        loaded = self._loaded[kind]
+        files = self._files(kind)
+        changed = set(files) != set(loaded)
+        for path in set(loaded) - set(files):
+            del loaded[path]
+        for path in files:
+            if path not in loaded:
+                try:
+                    # The table's buffers point into the mapping, which stays alive as long as they do
+                    loaded[path] = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+                except FileNotFoundError:
+                    # Compacted away by another process since the glob; its merged file is picked up next time
+                    changed = True
+        if changed and kind == "players":
+            self._latest = None
+        if not loaded:
+            return schema.empty_table()
+        return pa.concat_tables(loaded.values())
+
+    # Write table to path in one step: readers see the old file or the new one, never half of one
+    def _write_file(self, path, table):
+        tmp = path + ".tmp"
+        with pa.OSFile(tmp, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp, path)
+
+    def _write(self, kind, table, scrape_date):
+        directory = os.path.join(self.root, kind, f"scrape_date={scrape_date}")
+        os.makedirs(directory, exist_ok=True)
+        self._write_file(os.path.join(directory, f"{uuid.uuid4().hex}.arrow"), table)
+
+    # Latest metadata row of every player; only rebuilt when the set of files changed
+    def _latest_players(self):
+        table = self._table("players", PLAYER_SCHEMA)
+        if self._latest is None:
+            if table.num_rows:
+                # Keep each url's newest row. Identical rows are dropped too: while a compaction
+                # has written its merged file but not yet removed the originals, both are visible.
+                table = table.take(pc.sort_indices(
+                    table, sort_keys=[("url", "ascending"), ("checked_at", "descending")]
+                ))
+                urls = table.column("url").combine_chunks()
+                first = pc.not_equal(urls.slice(1), urls.slice(0, len(urls) - 1))
+                table = table.filter(pa.concat_arrays([pa.array([True]), first]))
+            self._latest = table
+            self._known = {
+                row["url"]: tuple(row[field] for field in TRACKED_FIELDS)
+                for row in table.select(["url", *TRACKED_FIELDS]).to_pylist()
+            }
+        return self._latest
+
+    # Latest metadata of every player, as a small Arrow table
+    def players(self):
+        with self._lock:
+            return self._latest_players()
+
+    # Long-form scout summary rows for one player's latest scrape
+    def player_stats(self, url):
+        latest = self.players().filter(pc.equal(pc.field("url"), url))
+        if latest.num_rows == 0:
+            return None
+        digest = latest.column("stats_hash")[0].as_py()
+        with self._lock:
+            stats = self._table("stats", STATS_SCHEMA)
+        mask = pc.and_(pc.equal(stats.column("url"), url), pc.equal(stats.column("stats_hash"), digest))
+        rows = stats.filter(mask)
+        # The same rows can be in more than one file (mid-compaction, or stats that changed back)
+        statistic = rows.column("statistic").combine_chunks()
+        return rows.take(pc.index_in(pc.unique(statistic), value_set=statistic)).to_pandas()
+
+    # Hash of the data files' names, to tell whether matrix.arrow is up to date
+    def _sources(self):
+        names = [os.path.relpath(path, self.root) for kind in ("players", "stats") for path in self._files(kind)]
+        return hashlib.sha256("\n".join(names).encode("utf-8")).hexdigest()[:16]
+
+    def _map_matrix(self):
+        try:
+            return pa.ipc.open_file(pa.memory_map(os.path.join(self.root, "matrix.arrow"), "r")).read_all()
+        except FileNotFoundError:
+            return None
+
+    # Pivot every player's latest scout summary into one row per player (caller holds _lock)
+    def _build_matrix(self, sources):
+        players = self._latest_players()
+        stats = self._table("stats", STATS_SCHEMA) if players.num_rows else STATS_SCHEMA.empty_table()
+        if stats.num_rows:
+            # Only the rows of each player's latest scrape
+            stats = stats.join(players.select(["url", "stats_hash"]), ["url", "stats_hash"], join_type="left semi")
+        names = sorted(pc.unique(stats.column("statistic")).to_pylist()) if stats.num_rows else []
+        # Fixed-size lists need at least one slot; a store without statistics gets one unused one
+        width = max(1, len(names))
+        per90 = np.full((players.num_rows, width), np.nan, dtype=np.float32)
+        pct = np.full((players.num_rows, width), np.nan, dtype=np.float32)
+        if stats.num_rows:
+            rows = pc.index_in(stats.column("url"), value_set=players.column("url").combine_chunks()).to_numpy()
+            columns = pc.index_in(stats.column("statistic"), value_set=pa.array(names, pa.string())).to_numpy()
+            # Duplicate rows carry identical values, so writing them twice is harmless
+            per90[rows, columns] = stats.column("per90").to_numpy()
+            pct[rows, columns] = stats.column("percentile").to_numpy()
+        ages = pc.fill_null(pc.cast(players.column("age"), pa.float32()), pa.scalar(np.nan, pa.float32()))
+        table = pa.table({
+            "url": players.column("url"),
+            "name": players.column("name"),
+            "position": players.column("position"),
+            "age": ages,
+            "team": players.column("team"),
+            "per90": pa.FixedSizeListArray.from_arrays(pa.array(per90.ravel()), width),
+            "pct": pa.FixedSizeListArray.from_arrays(pa.array(pct.ravel()), width),
+        }).combine_chunks()
+        table = table.replace_schema_metadata({"sources": sources, "statistics": json.dumps(names)})
+        self._write_file(os.path.join(self.root, "matrix.arrow"), table)
+        return self._map_matrix()
+
+    # Every player's latest scout summary as one memory-mapped table: url, name, position, age
+    # (NaN if unknown), team, and per90/pct as float32 lists with one slot per statistic (names
+    # in the 'statistics' metadata, NaN where a player lacks one). Whichever process first sees
+    # the data files change rebuilds matrix.arrow; the others map the new file.
+    def matrix(self):
+        sources = self._sources()
+
+        def current(table):
+            return table is not None and table.schema.metadata.get(b"sources") == sources.encode()
+
+        with self._lock:
+            if current(self._matrix):
+                return self._matrix
+        table = self._map_matrix()
+        if not current(table):
+            with self._file_lock("matrix.lock", block=True):
+                table = self._map_matrix()
+                if not current(table):
+                    with self._lock:
+                        table = self._build_matrix(sources)
+        with self._lock:
+            self._matrix = table
+        return table
+
+    # URLs with no scrape newer than max_age seconds
+    def stale_urls(self, urls, max_age):
+        latest = self.players()
+        checked = dict(zip(latest.column("url").to_pylist(), latest.column("checked_at").to_pylist()))
+        for url, checked_at in self._checks.connect().execute("SELECT url, checked_at FROM checks"):
+            checked[url] = max(checked.get(url, 0), checked_at)
+        cutoff = time.time() - max_age
+        return [url for url in urls if checked.get(url, 0) < cutoff]
+
+    # Record scraped pages. Metadata and stats rows are only written for players whose data
+    # changed; an unchanged player costs one row update in the checks table.
+    def upsert(self, pages):
+        if not pages:
+            return 0
+        now = time.time()
+        scrape_date = datetime.fromtimestamp(now, timezone.utc).strftime("%Y-%m-%d")
+        scraped = []
+        for url, page in pages:
+            values = stats_to_values(page.stats_df)
+            row = {
+                "url": url, "name": page.name, "position": page.position, "birthday": page.birthday,
+                "age": page.age, "team": page.team, "photo_url": page.photo_url,
+                "stats_hash": stats_hash(values), "checked_at": now,
+            }
+            scraped.append((row, values))
+
+        with self._lock:
+            self._latest_players()
+            player_rows = []
+            stat_rows = []
+            for row, values in scraped:
+                previous = self._known.get(row["url"])
+                if previous == tuple(row[field] for field in TRACKED_FIELDS):
+                    continue
+                player_rows.append(row)
+                if previous is None or previous[-1] != row["stats_hash"]:
+                    stat_rows.extend(
+                        {"url": row["url"], "stats_hash": row["stats_hash"], "statistic": stat,
+                         "per90": per90, "percentile": pct}
+                        for stat, (per90, pct) in values.items()
+                    )
+            if stat_rows:
+                self._write("stats", pa.Table.from_pylist(stat_rows, schema=STATS_SCHEMA), scrape_date)
+            if player_rows:
+                self._write("players", pa.Table.from_pylist(player_rows, schema=PLAYER_SCHEMA), scrape_date)
+                self._latest = None
+                self._compact(scrape_date)
+        self._checks.connect().executemany(
+            "INSERT OR REPLACE INTO checks (url, checked_at) VALUES (?, ?)",
+            [(row["url"], now) for row, _ in scraped]
+        )
+        return len(stat_rows)
+
+    # Merge one partition's small files into one; only one process compacts at a time
+    def _compact_partition(self, kind, directory):
+        paths = sorted(glob.glob(os.path.join(directory, "*.arrow")))
+        if len(paths) < 2:
+            return
+        tables = []
+        for path in paths:
+            tables.append(pa.ipc.open_file(pa.memory_map(path, "r")).read_all())
+        merged = pa.concat_tables(tables).combine_chunks()
+        self._write(kind, merged, os.path.basename(directory).split("=", 1)[1])
+        for path in paths:
+            os.remove(path)
+            self._loaded[kind].pop(path, None)
+        self._latest = None
+
+    # Cross-process lock on <root>/<name>; yields whether it was acquired
+    @contextmanager
+    def _file_lock(self, name, block):
+        if fcntl is None:
+            yield True
+            return
+        fd = os.open(os.path.join(self.root, name), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | (0 if block else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            yield True
+        finally:
+            os.close(fd)
+
+    # Compact scrape_date's partitions once they hold more than max_files files (caller holds _lock)
+    def _compact(self, scrape_date):
+        directories = [
+            (kind, os.path.join(self.root, kind, f"scrape_date={scrape_date}")) for kind in ("players", "stats")
+        ]
+        full = [(kind, directory) for kind, directory in directories
+                if len(glob.glob(os.path.join(directory, "*.arrow"))) > self.max_files]
+        if not full:
+            return
+        # Another process already compacting will get to it; never block a scrape on that
+        with self._file_lock("compact.lock", block=False) as acquired:
+            if acquired:
+                for kind, directory in full:
+                    self._compact_partition(kind, directory)
+
+    # Merge each date partition's small files into one, to keep the file count down
+    def compact(self):
+        with self._lock, self._file_lock("compact.lock", block=True):
+            for kind in ("players", "stats"):
+                for directory in glob.glob(os.path.join(self.root, kind, "scrape_date=*")):
+                    self._compact_partition(kind, directory)
+
+
+_stats_store = None
+_stats_store_lock = threading.Lock()
+
+
+# Process-wide store instance
+def get_stats_store():
+    global _stats_store
+    if _stats_store is None:
+        with _stats_store_lock:
+            if _stats_store is None:
+                _stats_store = StatsStore()
+    return _stats_store
+
+
+# Re-scrape only the players whose stored data is older than max_age seconds.
+# fetch(url, max_age=...) must fetch a page no older than max_age and record the scrape in the
+# store, as scout.get_player_page does.
+def refresh(urls, max_age, fetch):
+    stale = get_stats_store().stale_urls(urls, max_age)
+    failed = 0
+    for url in stale:
+        try:
+            fetch(url, max_age=max_age)
+        except Exception as e:
+            failed += 1
+            print(f"{url}: {e}", file=sys.stderr)
+    return len(stale), failed
+
+
+# Usage: python stats_store.py refresh urls.txt --max-age-days 7
+#        python stats_store.py show https://fbref.com/en/players/1f44ac21/Erling-Haaland
+#        python stats_store.py compact
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the local store of scraped player stats.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    refresh_parser = commands.add_parser("refresh", help="re-scrape players whose data is too old")
+    refresh_parser.add_argument("urls", help="file with one FBref player URL per line")
+    refresh_parser.add_argument("--max-age-days", type=float, default=7)
+    show_parser = commands.add_parser("show", help="print a player's latest stored scout summary")
+    show_parser.add_argument("url", help="FBref player URL")
+    commands.add_parser("compact", help="merge small files within each scrape date")
+    args = parser.parse_args()
+
+    if args.command == "refresh":
+        import scout
+
+        with open(args.urls, encoding="utf-8") as f:
+            urls = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        stale, failed = refresh(urls, args.max_age_days * 86400, scout.get_player_page)
+        print(f"{stale} of {len(urls)} players were stale and re-scraped ({failed} failed)")
+    elif args.command == "show":
+        stats = get_stats_store().player_stats(args.url)
+        if stats is None:
+            print(f"{args.url} is not in the store", file=sys.stderr)
+            sys.exit(1)
+        print(stats[["statistic", "per90", "percentile"]].to_string(index=False))
+    else:
+        get_stats_store().compact()
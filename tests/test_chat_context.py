@@ -0,0 +1,33 @@
+from chat_context import ChatContext
+
+TURN = "The winger keeps beating his full-back on the outside and crossing early. " * 3
+
+
+def run_conversation(fold_target, questions=30):
+    calls = []
+
+    def summarize(summary, turns):
+        calls.append(len(turns))
+        return "Earlier: the analyst asked about crossing and pressing."
+
+    context = ChatContext({"role": "system", "content": "You are a scout."}, summarize,
+                          budget=1000, keep_recent=2, fold_target=fold_target)
+    for _ in range(questions):
+        context.append("user", TURN)
+        context.messages()
+        assert context.requests[-1]["prompt_tokens"] <= context.budget
+        context.append("assistant", TURN)
+    return calls
+
+
+def test_folds_down_to_target_so_summaries_are_amortized():
+    amortized = run_conversation(fold_target=0.7)
+    at_budget = run_conversation(fold_target=1.0)
+
+    assert amortized
+    assert len(amortized) * 2 <= len(at_budget)
+    assert all(folded > 1 for folded in amortized)
+
+
+def test_no_summary_while_under_budget():
+    assert run_conversation(fold_target=0.7, questions=2) == []
@@ -0,0 +1,82 @@
+import glob
+import io
+import os
+from datetime import datetime
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+bs4 = pytest.importorskip("bs4")
+pytest.importorskip("lxml")
+
+from fbref_parser import parse_player_page  # noqa: E402
+from settings import FBREF_ROOT  # noqa: E402
+
+FIXTURES = sorted(glob.glob(os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures", "fbref", "players", "*.html"
+)))
+
+
+# The original BeautifulSoup extraction from app_ai.get_player_data, kept verbatim apart from
+# taking the HTML directly, raising instead of reporting to Streamlit, and using FBREF_ROOT
+# (which defaults to https://fbref.com) for relative photo links
+def baseline_player_data(html):
+    soup = bs4.BeautifulSoup(html, 'html.parser')
+
+    name = soup.select_one('h1 span').text.strip() if soup.select_one('h1 span') else None
+    position = None
+    position_element = soup.select_one('p:-soup-contains("Position:")')
+    if position_element:
+        text = position_element.get_text()
+        position = text.split("Position:")[1].split("▪")[0].strip()
+    birthday = soup.select_one('span[id="necro-birth"]').text.strip()
+    age = (datetime.now() - datetime.strptime(birthday, '%B %d, %Y')).days // 365
+    team = soup.select_one('p:-soup-contains("Club")').text.split(':')[-1].strip()
+
+    photo_url = None
+    photo_element = soup.select_one('img[class*="headshot"]')
+    if photo_element and 'src' in photo_element.attrs:
+        photo_url = photo_element['src']
+        if not photo_url.startswith('http'):
+            photo_url = f"{FBREF_ROOT}{photo_url}"
+    else:
+        media_div = soup.select_one('div.media-item')
+        if media_div:
+            photo_element = media_div.find('img')
+            if photo_element and 'src' in photo_element.attrs:
+                photo_url = photo_element['src']
+                if not photo_url.startswith('http'):
+                    photo_url = f"{FBREF_ROOT}{photo_url}"
+
+    table_id = None
+    for table in soup.find_all('table'):
+        table_id = table.get('id', '')
+        if table_id and table_id.startswith('scout_summary_'):
+            break
+    if not table_id or not table_id.startswith('scout_summary_'):
+        table_id = "scout_summary_AM"
+
+    df = pd.read_html(io.StringIO(html), attrs={'id': table_id})[0]
+    df = df.dropna(subset='Statistic')
+
+    return name, position, age, team, photo_url, df
+
+
+def test_fixtures_present():
+    assert FIXTURES
+
+
+@pytest.mark.parametrize("path", FIXTURES, ids=os.path.basename)
+def test_parse_player_page_matches_baseline(path):
+    with open(path, encoding="utf-8") as f:
+        html = f.read()
+    name, position, age, team, photo_url, stats_df = baseline_player_data(html)
+
+    page = parse_player_page(html)
+
+    assert page.name == name
+    assert page.position == position
+    assert page.age == age
+    assert page.team == team
+    assert page.photo_url == photo_url
+    pd.testing.assert_frame_equal(page.stats_df, stats_df)
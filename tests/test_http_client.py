@@ -0,0 +1,26 @@
+import time
+
+import pytest
+
+pytest.importorskip("requests")
+
+from http_client import RateLimited, TokenBucket  # noqa: E402
+
+
+def test_acquire_gives_up_after_max_wait():
+    bucket = TokenBucket(rate=1 / 60, capacity=1)
+    bucket.acquire(max_wait=0.1)
+
+    start = time.monotonic()
+    with pytest.raises(RateLimited):
+        bucket.acquire(max_wait=0.1)
+    assert time.monotonic() - start < 0.1
+
+
+def test_acquire_waits_within_max_wait():
+    bucket = TokenBucket(rate=20, capacity=1)
+    bucket.acquire(max_wait=1)
+
+    start = time.monotonic()
+    bucket.acquire(max_wait=1)
+    assert 0.02 < time.monotonic() - start < 1
@@ -0,0 +1,86 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("openai")
+pytest.importorskip("lxml")
+
+import fake_servers  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HAALAND_URL = "/en/players/1f44ac21/Erling-Haaland"
+RESERVE_URL = "/en/players/0a1b2c3d/Reserve-Midfielder"
+
+
+@pytest.fixture(scope="module")
+def servers():
+    fbref = fake_servers.serve(fake_servers.FakeFBrefHandler)
+    openai = fake_servers.serve(fake_servers.FakeOpenAIHandler, tokens=40)
+    yield f"http://127.0.0.1:{fbref.server_port}", f"http://127.0.0.1:{openai.server_port}/v1"
+    fbref.shutdown()
+    openai.shutdown()
+
+
+# Settings are read at import time, so every run gets a fresh interpreter pointed at the fakes
+def run_cli(servers, tmp_path, *args):
+    fbref_root, openai_url = servers
+    env = dict(
+        os.environ,
+        SCOUT_FBREF_ROOT=fbref_root,
+        OPENAI_BASE_URL=openai_url,
+        OPENAI_API_KEY="test",
+        SCOUT_CACHE_DIR=str(tmp_path / "cache"),
+    )
+    return subprocess.run(
+        [sys.executable, os.path.join(ROOT, "scout_cli.py"), *args, "--fbref-rate", "1000"],
+        env=env, cwd=tmp_path, capture_output=True, text=True, timeout=120
+    )
+
+
+def read_records(path):
+    with open(path, encoding="utf-8") as f:
+        return {record["input"]: record for record in map(json.loads, f)}
+
+
+def test_bulk_reports_and_resume(servers, tmp_path):
+    fbref_root, _ = servers
+    inputs = tmp_path / "shortlist.txt"
+    inputs.write_text(f"Haaland\n{fbref_root}{RESERVE_URL}  # no headshot\nNobody Atall\n", encoding="utf-8")
+    out = tmp_path / "reports"
+
+    first = run_cli(servers, tmp_path, str(inputs), "--out", str(out), "--format", "markdown")
+    assert first.returncode == 1, first.stderr
+    assert "3 players, 0 already done, 3 to run" in first.stderr
+
+    records = read_records(out / "reports.jsonl")
+    assert set(records) == {"Haaland", f"{fbref_root}{RESERVE_URL}", "Nobody Atall"}
+
+    haaland = records["Haaland"]
+    assert haaland["url"] == f"{fbref_root}{HAALAND_URL}"
+    assert haaland["name"] == "Erling Haaland"
+    assert haaland["report"] and "error" not in haaland
+    with open(haaland["path"], encoding="utf-8") as f:
+        markdown = f.read()
+    assert markdown.startswith("![Erling Haaland](Erling_Haaland.jpg)")
+    assert (out / "Erling_Haaland.jpg").stat().st_size > 0
+
+    reserve = records[f"{fbref_root}{RESERVE_URL}"]
+    assert reserve["report"] and "error" not in reserve
+    with open(reserve["path"], encoding="utf-8") as f:
+        assert not f.read().startswith("![")
+    assert not (out / f"{os.path.splitext(os.path.basename(reserve['path']))[0]}.jpg").exists()
+
+    assert records["Nobody Atall"]["error"] == "fetch: Player not found"
+    assert "report" not in records["Nobody Atall"]
+
+    # Finished players are skipped; only the failure is tried again
+    second = run_cli(servers, tmp_path, str(inputs), "--out", str(out), "--format", "markdown")
+    assert second.returncode == 1, second.stderr
+    assert "3 players, 2 already done, 1 to run" in second.stderr
+    with open(out / "reports.jsonl", encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    assert len(lines) == 4
+    assert lines[-1]["input"] == "Nobody Atall"
@@ -0,0 +1,69 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("fcntl")
+
+from single_flight import SingleFlight  # noqa: E402
+
+
+# flock locks held through different descriptors conflict even within one process, so two
+# instances sharing a lock directory behave like two worker processes
+@pytest.fixture
+def flights(tmp_path):
+    return SingleFlight(str(tmp_path)), SingleFlight(str(tmp_path))
+
+
+def same_slot(flight, key, kind):
+    suffix = flight._lock_path(key).rsplit("-", 1)[1]
+    return next(
+        (kind, f"https://fbref.com/en/players/{i}") for i in range(100000)
+        if flight._lock_path((kind, f"https://fbref.com/en/players/{i}")).endswith(suffix)
+    )
+
+
+def test_page_fetch_does_not_queue_behind_a_stream_in_its_slot(flights):
+    first, second = flights
+    release = threading.Event()
+
+    def slow_stream():
+        yield "Scouting"
+        release.wait(5)
+        yield " report"
+
+    chunks = first.stream(("completion", "abc"), slow_stream)
+    assert next(chunks) == "Scouting"
+
+    page_key = same_slot(first, ("completion", "abc"), "page")
+    start = time.monotonic()
+    assert second.do(page_key, lambda: "<html>", timeout=2) == "<html>"
+    assert time.monotonic() - start < 1
+
+    release.set()
+    assert list(chunks) == [" report"]
+
+
+def test_same_key_takes_turns_across_processes(flights):
+    first, second = flights
+    order = []
+    started = threading.Event()
+
+    def leader():
+        started.set()
+        time.sleep(0.3)
+        order.append("first")
+
+    thread = threading.Thread(target=first.do, args=(("page", "url"), leader))
+    thread.start()
+    started.wait()
+    second.do(("page", "url"), lambda: order.append("second"))
+    thread.join()
+    assert order == ["first", "second"]
+
+
+def test_lock_directory_is_bounded(flights, tmp_path):
+    first, _ = flights
+    for i in range(3000):
+        first.do(("page", f"url-{i}"), lambda: None)
+    assert len(list(tmp_path.iterdir())) <= 1024
@@ -0,0 +1,43 @@
+import threading
+import time
+
+from sqlite_cache import LRUCache, process_instance
+
+
+class NoteCache(LRUCache):
+    table = "notes"
+    key = "name"
+
+    def __init__(self, path, max_bytes):
+        super().__init__(path, "name TEXT PRIMARY KEY, size INTEGER NOT NULL, last_access REAL NOT NULL", max_bytes)
+
+    def put(self, name, size):
+        conn = self.connect()
+        conn.execute("INSERT OR REPLACE INTO notes (name, size, last_access) VALUES (?, ?, ?)",
+                     (name, size, time.time()))
+        self._evict(conn)
+
+
+def test_evicts_least_recently_used_until_under_budget(tmp_path):
+    cache = NoteCache(str(tmp_path / "notes.sqlite3"), max_bytes=25)
+    for name in "abc":
+        cache.put(name, 10)
+    names = [row[0] for row in cache.connect().execute("SELECT name FROM notes ORDER BY name")]
+    assert names == ["b", "c"]
+    stats = cache.stats()
+    assert (stats["entries"], stats["bytes"], stats["evictions"]) == (2, 20, 1)
+
+    cache.clear()
+    assert cache.stats()["entries"] == 0
+
+
+def test_process_instance_is_created_once():
+    created = []
+    get = process_instance(lambda *args: created.append(args) or object())
+    threads = [threading.Thread(target=get, args=("x",)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert get() is get("y")
+    assert created == [("x",)]
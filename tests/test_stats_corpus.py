@@ -0,0 +1,67 @@
+import glob
+import os
+
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+pytest.importorskip("lxml")
+
+from fbref_parser import parse_player_page  # noqa: E402
+from stats_corpus import StatsCorpus  # noqa: E402
+from stats_store import StatsStore  # noqa: E402
+
+FIXTURES = sorted(glob.glob(os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures", "fbref", "players", "*.html"
+)))
+
+
+def fixture_pages():
+    pages = []
+    for path in FIXTURES:
+        with open(path, encoding="utf-8") as f:
+            pages.append((f"/en/players/{os.path.basename(path).split('-', 1)[0]}", parse_player_page(f.read())))
+    return pages
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    store = StatsStore(str(tmp_path / "stats_store"))
+    store.upsert(fixture_pages())
+    return StatsCorpus(store)
+
+
+def url_of(corpus, name):
+    return next(player["url"] for player in corpus.players if player["name"] == name)
+
+
+def test_players_without_shared_stats_are_not_similar(corpus):
+    # Goalkeepers and outfield players have disjoint scout summaries
+    similar = corpus.similar(url_of(corpus, "Erling Haaland"))
+    assert "Alisson" not in set(similar["name"])
+    assert len(similar) == len(FIXTURES) - 2
+    assert list(similar["similarity"]) == sorted(similar["similarity"], reverse=True)
+
+    assert corpus.similar(url_of(corpus, "Alisson")).empty
+
+
+def test_compare_lines_up_statistics(corpus):
+    haaland, alisson = url_of(corpus, "Erling Haaland"), url_of(corpus, "Alisson")
+    table = corpus.compare([haaland, alisson])
+    assert list(table.columns.get_level_values(0).unique()) == ["Erling Haaland", "Alisson"]
+    # Every statistic either player has, and no others
+    assert table.notna().any(axis=1).all()
+    assert table[("Erling Haaland", "Per 90")].notna().sum() == 19
+    assert table[("Alisson", "Per 90")].notna().sum() == 13
+
+
+def test_new_players_show_up_without_a_restart(tmp_path):
+    store = StatsStore(str(tmp_path / "stats_store"))
+    pages = fixture_pages()
+    store.upsert(pages[:2])
+    corpus = StatsCorpus(store)
+    assert len(corpus) == 2
+
+    # Written by another process, sharing the same store directory
+    StatsStore(store.root).upsert(pages[2:])
+    assert len(corpus) == len(pages)
@@ -0,0 +1,63 @@
+import glob
+import os
+import shutil
+
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+pytest.importorskip("lxml")
+
+from fbref_parser import parse_player_page  # noqa: E402
+from stats_store import StatsStore  # noqa: E402
+
+FIXTURES = sorted(glob.glob(os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fixtures", "fbref", "players", "*.html"
+)))
+
+
+@pytest.fixture
+def pages():
+    pages = []
+    for path in FIXTURES:
+        with open(path, encoding="utf-8") as f:
+            pages.append((f"/en/players/{os.path.basename(path).split('-', 1)[0]}", parse_player_page(f.read())))
+    return pages
+
+
+def data_files(store):
+    return glob.glob(os.path.join(store.root, "*", "scrape_date=*", "*.arrow"))
+
+
+def test_unchanged_players_are_not_rewritten(tmp_path, pages):
+    store = StatsStore(str(tmp_path))
+    store.upsert(pages)
+    files = data_files(store)
+    assert store.upsert(pages) == 0
+    assert data_files(store) == files
+
+
+def test_reads_ignore_copies_left_mid_compaction(tmp_path, pages):
+    store = StatsStore(str(tmp_path))
+    for page in pages:
+        store.upsert([page])
+    url = pages[0][0]
+    expected = store.player_stats(url)
+
+    # A compaction has written its merged files but not yet removed the originals
+    for kind in ("players", "stats"):
+        for path in glob.glob(os.path.join(str(tmp_path), kind, "scrape_date=*", "*.arrow")):
+            shutil.copy(path, path.replace(".arrow", "-copy.arrow"))
+
+    reader = StatsStore(str(tmp_path))
+    assert reader.players().num_rows == len(pages)
+    assert reader.player_stats(url).equals(expected)
+    assert reader.matrix().num_rows == len(pages)
+
+
+def test_compaction_keeps_every_player(tmp_path, pages):
+    store = StatsStore(str(tmp_path), max_files=2)
+    for page in pages:
+        store.upsert([page])
+    assert len(data_files(store)) <= 2 * 3
+    assert StatsStore(str(tmp_path)).players().num_rows == len(pages)
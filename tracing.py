@@ -0,0 +1,202 @@
+import bisect
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from settings import METRICS_FILE, METRICS_FILE_INTERVAL, METRICS_PORT
+
+# Histogram bucket upper bounds in seconds, from a cached page read to a long report
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80)
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    # Upper bound of the bucket holding quantile q
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return BUCKETS[i] if i < len(BUCKETS) else float("inf")
+        return float("inf")
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    inner = ",".join(f'{key}="{str(value).replace(chr(34), chr(39))}"' for key, value in labels)
+    return "{" + inner + "}"
+
+
+# In-process metrics: histograms of span durations plus counters for bytes, tokens and cache results
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    # Prometheus text exposition format
+    def render_prometheus(self):
+        lines = []
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+        typed = set()
+        for (name, labels), histogram in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            cumulative = 0
+            for bound, count in zip(BUCKETS + (float("inf"),), histogram.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{_label_text(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_label_text(labels)} {histogram.sum}")
+            lines.append(f"{name}_count{_label_text(labels)} {histogram.count}")
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{_label_text(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    # Per-span summary rows for the diagnostics panel
+    def span_summary(self):
+        with self._lock:
+            histograms = [(dict(labels), h) for (name, labels), h in self.histograms.items()
+                          if name == "scout_span_seconds"]
+            counters = dict(self.counters)
+        rows = []
+        for labels, histogram in sorted(histograms, key=lambda item: item[0]["span"]):
+            span = labels["span"]
+            row = {
+                "span": span,
+                "count": histogram.count,
+                "mean_s": histogram.sum / histogram.count if histogram.count else 0.0,
+                "p50_s": histogram.quantile(0.5),
+                "p95_s": histogram.quantile(0.95),
+                "bytes": counters.get(("scout_span_bytes_total", (("span", span),)), 0),
+                "tokens": sum(value for (name, lbls), value in counters.items()
+                              if name == "scout_span_tokens_total" and ("span", span) in lbls),
+                "cache_hits": counters.get(("scout_span_cache_total", (("result", "hit"), ("span", span))), 0),
+                "errors": counters.get(("scout_span_errors_total", (("span", span),)), 0),
+            }
+            rows.append(row)
+        return rows
+
+
+registry = Registry()
+
+
+# Time a block of work as a named span. Inside it, annotate() adds bytes, tokens or a cache result.
+@contextmanager
+def span(name):
+    attrs = {}
+    token = _current_span.set(attrs)
+    start = time.perf_counter()
+    try:
+        yield attrs
+    except BaseException:
+        registry.inc("scout_span_errors_total", span=name)
+        raise
+    finally:
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # A streaming generator finalized from another thread or context
+            pass
+        registry.observe("scout_span_seconds", time.perf_counter() - start, span=name)
+        if attrs.get("bytes"):
+            registry.inc("scout_span_bytes_total", attrs["bytes"], span=name)
+        for kind in ("prompt", "completion"):
+            if attrs.get(f"{kind}_tokens"):
+                registry.inc("scout_span_tokens_total", attrs[f"{kind}_tokens"], span=name, kind=kind)
+        if attrs.get("cache"):
+            registry.inc("scout_span_cache_total", span=name, result=attrs["cache"])
+        if attrs.get("first_token") is not None:
+            registry.observe("scout_first_token_seconds", attrs["first_token"] - start, span=name)
+
+
+# Attach attributes to the innermost open span in this context, if any
+def annotate(**attrs):
+    current = _current_span.get()
+    if current is not None:
+        current.update(attrs)
+
+
+# Mark the moment the first streamed token arrived in the current span
+def first_token():
+    current = _current_span.get()
+    if current is not None and "first_token" not in current:
+        current["first_token"] = time.perf_counter()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = registry.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _write_metrics_file(path, interval):
+    while True:
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(registry.render_prometheus())
+        os.replace(tmp, path)
+        time.sleep(interval)
+
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+# Start the configured exporters once per process: an HTTP /metrics endpoint and/or a textfile
+def start_exporters(port=METRICS_PORT, path=METRICS_FILE, interval=METRICS_FILE_INTERVAL):
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+    if port:
+        server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    if path:
+        threading.Thread(target=_write_metrics_file, args=(path, interval),
+                         name="metrics-file", daemon=True).start()
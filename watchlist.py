@@ -0,0 +1,134 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import scout
+from http_client import get_http_client
+from llm_cache import get_llm_cache
+from scout_cli import is_player_url, read_inputs
+from settings import CACHE_DIR
+from sqlite_cache import SQLiteFile
+from stats_store import stats_hash, stats_to_values
+
+
+# What was last generated for each watchlist player: the stats it was based on and the report text.
+# The text is kept here too, so an unchanged player's report can be put back into the LLM cache
+# after it expires there without paying for a new completion.
+class WatchlistState(SQLiteFile):
+    def __init__(self, path=None):
+        super().__init__(path or os.path.join(CACHE_DIR, "watchlist.sqlite3"))
+        with self.connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS reports (
+                    url TEXT PRIMARY KEY,
+                    name TEXT,
+                    stats_hash TEXT NOT NULL,
+                    report TEXT NOT NULL,
+                    generated_at REAL NOT NULL,
+                    checked_at REAL NOT NULL
+                )
+            """)
+
+    # (stats_hash, report) of the last report generated for url, or None
+    def get(self, url):
+        return self.connect().execute(
+            "SELECT stats_hash, report FROM reports WHERE url = ?", (url,)
+        ).fetchone()
+
+    def put(self, url, name, digest, report):
+        now = time.time()
+        self.connect().execute(
+            "INSERT OR REPLACE INTO reports (url, name, stats_hash, report, generated_at, checked_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (url, name, digest, report, now, now)
+        )
+
+    def touch(self, url):
+        self.connect().execute("UPDATE reports SET checked_at = ? WHERE url = ?", (time.time(), url))
+
+
+# Scrape one watchlist player and make sure the app will find its report in the caches.
+# Returns "generated" when the LLM was called, "unchanged" when the stats were the same as last time.
+def prewarm(state, value, max_page_age, force=False):
+    url = value if is_player_url(value) else scout.search_player(value)
+    if not url:
+        raise LookupError("Player not found")
+
+    page = scout.get_player_page(url, max_age=max_page_age)
+    scout.get_player_photo(page.photo_url)
+    digest = stats_hash(stats_to_values(page.stats_df))
+    args = (page.name, page.position, page.age, page.team, page.stats_df)
+
+    previous = state.get(url)
+    if previous is not None and previous[0] == digest and not force:
+        # Same numbers: keep serving the report we already have. Its cache key can still change
+        # (the player had a birthday, or the entry expired), so re-file it under the current one.
+        key = scout.report_key(*args)
+        cache = get_llm_cache()
+        if cache.get(key, count=False) is None:
+            cache.put(key, scout.REPORT_MODEL, previous[1])
+        state.touch(url)
+        return page.name, "unchanged"
+
+    # Stats changed (or the player is new): this is the only case that spends LLM tokens
+    report = scout.generate_scouting_report(*args, force=force)
+    state.put(url, page.name, digest, report)
+    return page.name, "generated"
+
+
+# One pass over the watchlist; returns {"generated": n, "unchanged": n, "failed": n}
+def run_once(state, inputs, workers, max_page_age, force=False):
+    counts = {"generated": 0, "unchanged": 0, "failed": 0}
+
+    def work(value):
+        try:
+            name, status = prewarm(state, value, max_page_age, force)
+            print(f"{status:>9}  {name}", file=sys.stderr)
+        except Exception as e:
+            status = "failed"
+            print(f"{status:>9}  {value}: {e}", file=sys.stderr)
+        return status
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="watchlist") as executor:
+        for status in executor.map(work, inputs):
+            counts[status] += 1
+    return counts
+
+
+# Usage: python watchlist.py watchlist.txt --every-hours 24
+#        python watchlist.py watchlist.txt --once
+# Runs as its own process next to the app; both share the page, photo and LLM caches in CACHE_DIR.
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Keep scouting reports for a watchlist warm, regenerating only when stats change."
+    )
+    parser.add_argument("watchlist", help="file with one FBref player URL or name per line ('-' for stdin)")
+    parser.add_argument("--every-hours", type=float, default=24, help="time between passes over the watchlist")
+    parser.add_argument("--once", action="store_true", help="make one pass and exit")
+    parser.add_argument("--workers", type=int, default=2, help="players processed at once")
+    parser.add_argument("--max-page-age-hours", type=float, default=None,
+                        help="re-scrape pages older than this (defaults to half the pass interval)")
+    parser.add_argument("--force", action="store_true", help="regenerate every report this pass")
+    args = parser.parse_args()
+
+    interval = args.every_hours * 3600
+    # Anything fetched during the previous pass must count as stale by the next one
+    max_page_age = (args.max_page_age_hours * 3600 if args.max_page_age_hours is not None
+                    else interval / 2)
+    # A background pass waits its turn for the FBref rate limit instead of giving up
+    get_http_client().max_wait = None
+    state = WatchlistState()
+    stdin_inputs = read_inputs("-") if args.watchlist == "-" else None
+    while True:
+        started = time.monotonic()
+        # Re-read the file each pass so edits to the watchlist are picked up without a restart
+        inputs = stdin_inputs if stdin_inputs is not None else read_inputs(args.watchlist)
+        counts = run_once(state, inputs, args.workers, max_page_age, args.force)
+        print(f"{len(inputs)} players: {counts['generated']} generated, {counts['unchanged']} unchanged, "
+              f"{counts['failed']} failed", file=sys.stderr)
+        if args.once:
+            sys.exit(1 if counts["failed"] else 0)
+        args.force = False
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))